@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+# Categories that are not spending and are left out of totals and forecasts
+EXCLUDED_CATEGORIES = ['Income', 'Savings', 'Transfer']
+
+# One aggregate row per day, category, sign and waste flag
+AGGREGATE_KEYS = ['Year', 'Month', 'WeekOfMonth', 'Day', 'Category', 'Positive', 'Waste']
+
+
+# --- Statement Columns (full or compact layout) ---
+def statement_amounts(df):
+    """Amount in dollars, whether stored as floats or as compact integer cents."""
+    if 'Amount' in df.columns:
+        return df['Amount']
+    return df['AmountCents'] / 100
+
+def statement_cents(df):
+    """Amount as int64 cents."""
+    if 'AmountCents' in df.columns:
+        return df['AmountCents'].to_numpy(dtype=np.int64)
+    return np.round(df['Amount'].to_numpy(dtype=np.float64) * 100).astype(np.int64)
+
+def statement_descriptions(df):
+    """Description column, which compact statements leave to Category when it only repeats it."""
+    if 'Description' in df.columns:
+        return df['Description']
+    return df['Category']
+
+
+# --- Period/Category Aggregate ---
+def aggregate_statement(df):
+    """Sums a cleaned statement into the period/category aggregate.
+
+    Amounts are summed as integer cents so the totals do not depend on row
+    order, which keeps chunked and full-frame aggregates identical. The waste
+    flag is the 'Waste' label stored at ingest (False when unlabelled).
+    """
+    keyed = pd.DataFrame({
+        'Year': df['Year'],
+        'Month': df['Month'],
+        'WeekOfMonth': df['WeekOfMonth'],
+        'Day': df['Day'],
+        'Category': df['Category'].astype(object),
+        'Positive': statement_amounts(df) > 0,
+        'Waste': df['Waste'] if 'Waste' in df.columns else False,
+        'Cents': statement_cents(df),
+    })
+    return combine_aggregates([keyed.assign(Count=1)])
+
+def combine_aggregates(parts):
+    """Merges partial aggregates (or keyed rows with Count=1) into one sorted aggregate."""
+    combined = pd.concat(parts, ignore_index=True)
+    return (combined.groupby(AGGREGATE_KEYS, dropna=False, sort=True)[['Cents', 'Count']]
+            .sum().reset_index())
+
+
+class StatementAggregator:
+    """Incrementally builds the period/category aggregate from statement chunks."""
+
+    def __init__(self):
+        self.rows = 0
+        self.dates_coerced = 0
+        self._agg = None
+
+    def update(self, chunk):
+        self.dates_coerced += chunk.attrs.get('dates_coerced', 0)
+        if chunk.empty:
+            return
+        self.rows += len(chunk)
+        partial = aggregate_statement(chunk)
+        # Fold into the running aggregate right away so memory never grows with chunk count
+        self._agg = partial if self._agg is None else combine_aggregates([self._agg, partial])
+
+    def result(self):
+        if self._agg is None:
+            return pd.DataFrame(columns=AGGREGATE_KEYS + ['Cents', 'Count'])
+        return self._agg
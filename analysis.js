@@ -6,47 +6,27 @@ const MONTH_NAMES = [
     "July", "August", "September", "October", "November", "December"
 ];
 
-let allBankData = []; // To store all parsed data
+let statementSummary = null; // Years and latest period from the local API
+let tableRequest = null; // Period of the statement rows shown, for "Load more"
 
-// Utility function to determine the week number of the month
-function getWeekOfMonth(date) {
-    // Calculates the approximate week number within a month (1-4 or 5)
-    const dayOfMonth = date.getDate();
-    return Math.ceil(dayOfMonth / 7);
-}
-
-// Load saved bank statement and initialize dashboard
-document.addEventListener("DOMContentLoaded", () => {
-    const savedData = localStorage.getItem("bankData");
-    
+// Load the uploaded statement's summary and initialize dashboard
+document.addEventListener("DOMContentLoaded", async () => {
     // Get selectors and labels
     const scopeSelect = document.getElementById("scopeSelect");
     const yearSelect = document.getElementById("yearSelect");
     const monthSelect = document.getElementById("monthSelect");
     const weekSelect = document.getElementById("weekSelect");
 
-    if (savedData) {
+    if (getStatementId()) {
         try {
-            allBankData = JSON.parse(savedData).map(row => {
-                // Pre-process and enhance data
-                const dateObj = new Date(row.Date);
-                row.DateObj = dateObj;
-                row.Year = dateObj.getFullYear();
-                row.Month = dateObj.getMonth() + 1; // 1-12
-                row.WeekOfMonth = getWeekOfMonth(dateObj);
-                row.DayOfWeek = dateObj.getDay(); // 0 (Sun) - 6 (Sat)
-                return row;
-            });
-
-            if (allBankData.length > 0) {
+            statementSummary = await apiGet('summary');
+
+            if (statementSummary.years.length > 0) {
                 initializePeriodSelectors();
                 
                 // Set default period to the latest month
-                const latestYear = Math.max(...allBankData.map(d => d.Year));
-                const latestMonth = Math.max(...allBankData.filter(d => d.Year === latestYear).map(d => d.Month));
-                
-                yearSelect.value = latestYear;
-                monthSelect.value = MONTH_NAMES[latestMonth - 1]; // Set by name
+                yearSelect.value = statementSummary.latest.year;
+                monthSelect.value = MONTH_NAMES[statementSummary.latest.month - 1]; // Set by name
                 
                 // Initial render and set correct initial visibility
                 updateScopeVisibility();
@@ -63,8 +43,8 @@ document.addEventListener("DOMContentLoaded", () => {
                 document.querySelector('.main-area').innerHTML = '<p class="card full-width">No bank statement data available.</p>';
             }
         } catch (error) {
-            console.error("Error parsing bankData from localStorage:", error);
-            document.querySelector('.main-area').innerHTML = '<p class="card full-width">Error loading data. Please re-upload your statement.</p>';
+            console.error("Error loading the statement from the local API:", error);
+            document.querySelector('.main-area').innerHTML = `<p class="card full-width">Error loading data (${error.message}). Please re-upload your statement.</p>`;
         }
     } else {
         document.querySelector('.main-area').innerHTML = '<p class="card full-width">No bank statement uploaded. Please go to Home and upload a CSV file.</p>';
@@ -78,8 +58,7 @@ function initializePeriodSelectors() {
     const monthSelect = document.getElementById("monthSelect");
     
     // Populate Years
-    const uniqueYears = [...new Set(allBankData.map(d => d.Year))].sort((a, b) => b - a);
-    yearSelect.innerHTML = uniqueYears.map(year => `<option value="${year}">${year}</option>`).join('');
+    yearSelect.innerHTML = statementSummary.years.map(year => `<option value="${year}">${year}</option>`).join('');
     
     // Populate Months (static list)
     monthSelect.innerHTML = MONTH_NAMES.map(month => `<option value="${month}">${month}</option>`).join('');
@@ -127,92 +106,92 @@ function updateScopeVisibility() {
 }
 
 
-// Filter data and render all components
-function filterAndRender() {
+// Fetch the selected period's aggregates and render all components
+async function filterAndRender() {
     const scope = document.getElementById("scopeSelect").value;
     const year = parseInt(document.getElementById("yearSelect").value);
     const monthName = document.getElementById("monthSelect").value;
     const week = parseInt(document.getElementById("weekSelect").value);
     const month = MONTH_NAMES.indexOf(monthName) + 1; // 1-12
 
-    let filteredData = allBankData;
-    let trendGroupingKey = '';
-
-    // 1. Apply Filters based on Scope
-    if (scope === 'yearly' || scope === 'monthly' || scope === 'weekly') {
-        filteredData = filteredData.filter(d => d.Year === year);
-    }
+    const period = { scope, year };
     if (scope === 'monthly' || scope === 'weekly') {
-        filteredData = filteredData.filter(d => d.Month === month);
+        period.month = month;
     }
     if (scope === 'weekly') {
-        filteredData = filteredData.filter(d => d.WeekOfMonth === week);
+        period.week = week;
     }
 
-    // 2. Determine Trend Grouping Key
-    if (scope === 'yearly') {
-        trendGroupingKey = 'Month';
-    } else if (scope === 'monthly') {
-        trendGroupingKey = 'WeekOfMonth';
-    } else if (scope === 'weekly') {
-        trendGroupingKey = 'Date'; // Show daily data for a selected week
+    try {
+        const [aggregates, firstPage] = await Promise.all([apiGet('period', period), apiGet('transactions', period)]);
+        tableRequest = period;
+        renderTable(firstPage);
+        renderPieChart(aggregates.categories);
+        renderTrendGraph(aggregates.trend);
+    } catch (error) {
+        console.error("Error loading the period from the local API:", error);
+        document.getElementById("pieChart").innerHTML = `<p>Error loading data: ${error.message}</p>`;
     }
-
-    // 3. Render
-    renderTable(filteredData);
-    renderPieChart(filteredData);
-    renderTrendGraph(filteredData, trendGroupingKey, scope);
 }
 
 
-// Render statement table
-function renderTable(data) {
+// Render statement table, one page of rows at a time
+function renderTable(page) {
     const table = document.getElementById("statementTable");
-    table.innerHTML = "";
+    const header = "<thead><tr><th>Date</th><th>Category</th><th>Amount</th></tr></thead>";
 
-    if (!data || data.length === 0) {
-        table.innerHTML = "<thead><tr><th>Date</th><th>Category</th><th>Amount</th></tr></thead><tbody><tr><td colspan='3'>No data available for this selection.</td></tr></tbody>";
+    if (!page || page.total === 0) {
+        table.innerHTML = header + "<tbody><tr><td colspan='3'>No data available for this selection.</td></tr></tbody>";
+        appendLoadMore(null);
         return;
     }
 
-    // Filter to only display relevant columns: Date, Category, Amount
-    const headers = Object.keys(data[0]).filter(key => ['Date', 'Category', 'Amount'].includes(key));
-    let headerHtml = "<thead><tr>";
-    headers.forEach(h => { headerHtml += `<th>${h}</th>`; });
-    headerHtml += "</tr></thead>";
-    
-    let rowsHtml = "<tbody>";
-    data.forEach(row => {
-        let rowHtml = "<tr>";
-        headers.forEach(h => {
-            let cellContent = row[h];
-            if (h === 'Amount') {
-                cellContent = `$${row[h].toFixed(2)}`;
-            }
-            rowHtml += `<td>${cellContent}</td>`;
-        });
-        rowHtml += "</tr>";
-        rowsHtml += rowHtml;
+    table.innerHTML = header + "<tbody></tbody>";
+    appendTableRows(page);
+}
+
+function appendTableRows(page) {
+    const tbody = document.getElementById("statementTable").querySelector("tbody");
+
+    let rowsHtml = "";
+    page.rows.forEach(([date, category, , amount]) => {
+        rowsHtml += `<tr><td>${date}</td><td>${category ?? ''}</td><td>$${amount.toFixed(2)}</td></tr>`;
     });
-    rowsHtml += "</tbody>";
+    tbody.insertAdjacentHTML("beforeend", rowsHtml);
+    appendLoadMore(page);
+}
+
+// Rows past the loaded pages are fetched on demand
+function appendLoadMore(page) {
+    const oldButton = document.getElementById("loadMoreRows");
+    if (oldButton) {
+        oldButton.remove();
+    }
+    if (!page || page.next === null) {
+        return;
+    }
 
-    table.innerHTML = headerHtml + rowsHtml;
+    const button = document.createElement("button");
+    button.id = "loadMoreRows";
+    button.textContent = `Load more (${page.next} of ${page.total} shown)`;
+    button.addEventListener("click", async () => {
+        button.disabled = true;
+        const request = tableRequest;
+        const nextPage = await apiGet('transactions', { ...request, offset: page.next });
+        if (request === tableRequest) { // Ignore pages of a period no longer selected
+            appendTableRows(nextPage);
+        }
+    });
+    document.getElementById("statementTable").after(button);
 }
 
 
 // Render Pie Chart (Category Spending)
-function renderPieChart(data) {
+function renderPieChart(categories) {
     const chartDiv = document.getElementById("pieChart");
     
-    // Group by category and sum amounts (excluding Income and Credits)
-    const spendingByCategory = data.reduce((acc, item) => {
-        if (item.Amount > 0 && item.Category !== 'Income' && item.Category !== 'Savings' && item.Category !== 'Transfer') {
-            acc[item.Category] = (acc[item.Category] || 0) + item.Amount;
-        }
-        return acc;
-    }, {});
-    
-    const sortedCategories = Object.entries(spendingByCategory).sort(([, a], [, b]) => b - a);
+    // [category, amount] pairs from the API, largest first (Income and Credits already excluded)
+    const sortedCategories = categories;
     const totalExpense = sortedCategories.reduce((sum, [, amount]) => sum + amount, 0);
 
     if (totalExpense === 0) {
@@ -237,39 +216,17 @@ function renderPieChart(data) {
 
 
 // Render Trend Graph (Weekly/Monthly/Daily Spending)
-function renderTrendGraph(data, groupingKey, scope) {
+function renderTrendGraph(trend) {
     const chartDiv = document.getElementById("trendGraph");
 
-    if (!data || data.length === 0) {
+    if (!trend || trend.length === 0) {
         chartDiv.innerHTML = "<p>No spending data to visualize trends.</p>";
         return;
     }
     
-    // Group and aggregate data
-    const spendingByPeriod = data.reduce((acc, item) => {
-        if (item.Amount > 0 && item.Category !== 'Income' && item.Category !== 'Savings' && item.Category !== 'Transfer') {
-            let key;
-            if (groupingKey === 'Month') {
-                key = MONTH_NAMES[item.Month - 1];
-            } else if (groupingKey === 'WeekOfMonth') {
-                key = `Week ${item.WeekOfMonth}`;
-            } else if (groupingKey === 'Date') {
-                key = item.Date.substring(0, 10); // Use date string for daily
-            }
-            
-            acc[key] = (acc[key] || 0) + item.Amount;
-        }
-        return acc;
-    }, {});
-    
-    const sortedPeriods = Object.entries(spendingByPeriod).sort(([a], [b]) => {
-        if (scope === 'yearly') return MONTH_NAMES.indexOf(a) - MONTH_NAMES.indexOf(b);
-        if (scope === 'monthly') return parseInt(a.replace('Week ', '')) - parseInt(b.replace('Week ', ''));
-        if (scope === 'weekly') return new Date(a) - new Date(b); // Sort by date
-        return 0;
-    });
-
-    const maxAmount = Math.max(...Object.values(spendingByPeriod));
+    // [period, amount] pairs from the API, in period order
+    const sortedPeriods = trend;
+    const maxAmount = Math.max(...trend.map(([, amount]) => amount));
 
     if (maxAmount === 0) {
         chartDiv.innerHTML = "<p>No expenses found for this period.</p>";
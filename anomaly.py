@@ -0,0 +1,168 @@
+"""Streaming detection of unusual charges.
+
+AnomalyDetector keeps exponentially weighted statistics of the charge
+amount per category and per normalized description: a count, the mean and
+the mean square, so its state is O(1) per key. Each expense is scored
+against the statistics from before it and then folded in, in date order. An
+appended statement is therefore scored with just its own rows. The per-key
+recurrences run as segmented cumulative sums, not as a loop over
+transactions.
+"""
+import numpy as np
+import pandas as pd
+
+from aggregates import EXCLUDED_CATEGORIES, statement_amounts, statement_descriptions
+from ingest import normalize_descriptions
+
+# Weight of the newest charge in the running mean and mean square
+ANOMALY_ALPHA = 0.1
+# Standard deviations above the usual amount that make a charge unusual
+ANOMALY_THRESHOLD = 3.0
+# Earlier charges a category or description needs before its charges are scored
+ANOMALY_WARMUP = 5
+# The spread never counts as less than this fraction of the mean, so repeated
+# identical charges do not make a slightly larger one unusual
+MIN_RELATIVE_STD = 0.1
+
+
+def ewm_before(codes, values, initial, alpha):
+    """Exponentially weighted means per code as they stood before each row, plus the final means.
+
+    Rows are in time order and values is (rows, columns). The mean of a code
+    starts at initial[code] and becomes (1 - alpha) * mean + alpha * x with
+    each of its rows. Returns (before, after), where after holds every
+    code's mean past its last row.
+
+    With d = 1 - alpha, the mean before a code's q-th row is
+    d^q * (start + sum of alpha * d^-(j+1) * x_j over its earlier rows j),
+    which is a segmented cumulative sum. Rows are cut into blocks short
+    enough for d^-q to stay finite, and the block starts are chained in a
+    loop that runs once per block, not once per row.
+    """
+    after = initial.copy()
+    if len(codes) == 0:
+        return np.zeros((0, values.shape[1])), after
+    decay = 1 - alpha
+    block = max(1, int(300 / -np.log(decay)))
+
+    order = np.argsort(codes, kind='stable')
+    sorted_codes, x = codes[order], values[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    position = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    local = position % block
+    segment = np.cumsum(local == 0) - 1
+
+    weighted = alpha * decay ** -(local + 1.0)[:, None] * x
+    cumulative = pd.DataFrame(weighted).groupby(segment, sort=False).cumsum().to_numpy()
+
+    first = np.flatnonzero(local == 0)
+    segment_codes = sorted_codes[first]
+    totals = cumulative[np.r_[first[1:], len(order)] - 1]
+    lengths = np.diff(np.r_[first, len(order)])
+    blocks = position[first] // block
+    start = initial[segment_codes]
+    for b in range(1, blocks.max() + 1):
+        # A code's later blocks pick up where its previous (full) block ended
+        chained = np.flatnonzero(blocks == b)
+        start[chained] = decay ** block * (start[chained - 1] + totals[chained - 1])
+
+    before = np.empty_like(x)
+    before[order] = decay ** local[:, None] * (start[segment] + cumulative - weighted)
+    last = np.flatnonzero(np.r_[segment_codes[1:] != segment_codes[:-1], True])
+    after[segment_codes[last]] = decay ** lengths[last][:, None] * (start[last] + totals[last])
+    return before, after
+
+
+class KeyStatistics:
+    """Charge count, EW mean and EW mean square per key (a category or a description)."""
+
+    def __init__(self):
+        self._codes = {}
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.moments = np.zeros((0, 2))
+
+    def update(self, keys, amounts, alpha, warmup):
+        """Scores the charges against their key's statistics, then folds them in.
+
+        Returns standard deviations above the key's mean per charge, NaN
+        while the key has fewer than warmup earlier charges.
+        """
+        key_codes, uniques = pd.factorize(pd.Series(keys, dtype=object), use_na_sentinel=False)
+        mapping = np.array([self._codes.setdefault(str(key), len(self._codes)) for key in uniques],
+                           dtype=np.int64)
+        codes = mapping[key_codes]
+
+        grow = len(self._codes) - len(self.counts)
+        if grow:
+            # A new key starts from its first charge, with zero spread
+            _, first = np.unique(codes, return_index=True)
+            new = first[codes[first] >= len(self.counts)]
+            self.counts = np.concatenate([self.counts, np.zeros(grow, dtype=np.int64)])
+            self.moments = np.vstack([self.moments, np.zeros((grow, 2))])
+            self.moments[codes[new]] = np.column_stack([amounts[new], amounts[new] ** 2])
+
+        earlier = self.counts[codes] + pd.Series(codes).groupby(codes).cumcount().to_numpy()
+        before, self.moments = ewm_before(codes, np.column_stack([amounts, amounts ** 2]), self.moments, alpha)
+        self.counts += np.bincount(codes, minlength=len(self.counts))
+
+        mean = before[:, 0]
+        spread = np.sqrt(np.maximum(before[:, 1] - mean ** 2, 0))
+        spread = np.maximum(spread, MIN_RELATIVE_STD * np.abs(mean))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = (amounts - mean) / spread
+        scores[earlier < warmup] = np.nan
+        return scores
+
+
+class AnomalyDetector:
+    """Running statistics of the charges of one statement, per category and per description.
+
+    update() takes transactions in date order. It refuses rows dated before
+    the last transaction it has seen, and the caller rescores from the full
+    statement instead.
+    """
+
+    def __init__(self, alpha=ANOMALY_ALPHA, threshold=ANOMALY_THRESHOLD, warmup=ANOMALY_WARMUP):
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.last_date = None
+        self.categories = KeyStatistics()
+        self.descriptions = KeyStatistics()
+
+    def update(self, df):
+        """Scores the expenses of a date-sorted statement and folds them into the statistics.
+
+        Returns one score per row: standard deviations above the usual
+        amount of the charge's category or description, whichever is
+        larger. Income, excluded categories and keys still warming up get
+        NaN. Returns None, leaving the state untouched, if df starts before
+        the last transaction seen.
+        """
+        scores = np.full(len(df), np.nan)
+        if df.empty:
+            return scores
+        dates = df['DateObj'].to_numpy()
+        if self.last_date is not None and dates[0] < self.last_date:
+            return None
+
+        amounts = statement_amounts(df).to_numpy(dtype=np.float64)
+        rows = np.flatnonzero((amounts > 0) & ~df['Category'].isin(EXCLUDED_CATEGORIES).to_numpy())
+        amounts = amounts[rows]
+        category_scores = self.categories.update(df['Category'].to_numpy()[rows], amounts,
+                                                 self.alpha, self.warmup)
+        description_scores = self.descriptions.update(normalize_descriptions(statement_descriptions(df))[rows],
+                                                      amounts, self.alpha, self.warmup)
+        scores[rows] = np.fmax(category_scores, description_scores)
+        self.last_date = dates[-1]
+        return scores
+
+
+def label_anomalies(df, detector):
+    """Stores the anomaly scores and flags on the statement; None if the detector refused its dates."""
+    scores = detector.update(df)
+    if scores is None:
+        return None
+    df['AnomalyScore'] = scores
+    df['Anomaly'] = scores > detector.threshold
+    return df
@@ -0,0 +1,38 @@
+// api.js - client for the local JSON aggregate API (python api.py)
+
+// Pages served by api.py use relative URLs; pages opened from disk call the default local server
+const API_BASE = window.location.protocol === 'file:' ? 'http://localhost:8000' : '';
+
+// Id of the uploaded statement, kept instead of the parsed rows
+function getStatementId() {
+    return localStorage.getItem("statementId");
+}
+
+async function apiRequest(path, options) {
+    const response = await fetch(API_BASE + path, options);
+    const payload = await response.json().catch(() => ({}));
+    if (!response.ok) {
+        throw new Error(payload.error || `Request failed with status ${response.status}`);
+    }
+    return payload;
+}
+
+// GET /api/statements/<id>/<endpoint>?params; the browser revalidates with the ETag
+function apiGet(endpoint, params = {}) {
+    const query = new URLSearchParams(Object.entries(params).filter(([, value]) => value !== null && value !== undefined));
+    const suffix = query.toString() ? `?${query}` : '';
+    return apiRequest(`/api/statements/${encodeURIComponent(getStatementId())}/${endpoint}${suffix}`);
+}
+
+// Uploads the CSV text and remembers the statement id the server returns
+async function apiUpload(csvText) {
+    // text/plain keeps the request "simple", so pages opened from disk need no CORS preflight
+    const summary = await apiRequest('/api/statements', {
+        method: 'POST',
+        headers: { 'Content-Type': 'text/plain' },
+        body: csvText,
+    });
+    localStorage.setItem("statementId", summary.statement);
+    localStorage.removeItem("bankData");
+    return summary;
+}
@@ -0,0 +1,332 @@
+"""Local JSON API over parsed statements, for the static HTML/JS pages.
+
+A page uploads the CSV once. The server cleans it with the parse_csv rules,
+labels waste, and builds the same period cube and forecast state the
+Streamlit pages use. From then on the pages fetch only the aggregates of
+the scope and period they show, plus the statement table one page at a
+time, instead of keeping the whole statement in localStorage:
+
+    python api.py --port 8000    # then open http://localhost:8000/
+
+Endpoints (statement ids are content digests, so a statement never changes):
+
+    POST /api/statements                          CSV body -> id, years, latest period
+    GET  /api/statements/<id>/summary             years and latest period
+    GET  /api/statements/<id>/period?scope=...    total, category split, waste, trend
+    GET  /api/statements/<id>/transactions?...    expense rows, offset/limit pages
+    GET  /api/statements/<id>/forecast            per-category forecast table
+
+Every JSON body carries a strong ETag (If-None-Match gets a 304) and is
+gzip-compressed when the client accepts it. Rendered bodies are cached
+process-wide per parsed statement, so a statement that was evicted is
+answered with 404 rather than from its stale bodies.
+"""
+import argparse
+import gzip
+import io
+import itertools
+import json
+import os
+import sys
+import traceback
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from aggregates import aggregate_statement, statement_amounts, statement_descriptions
+from caching import LRUCache, content_digest, frame_nbytes
+from cube import PeriodCube
+from forecasting import ForecastState, build_category_monthly, cached_forecast, monthly_category_totals
+from ingest import StatementError, get_week_of_month, read_statement
+from precompute import period_aggregate
+from waste import DEFAULT_WASTE_KEYWORDS, WasteMatcher, label_waste
+
+MONTH_NAMES = ["January", "February", "March", "April", "May", "June",
+               "July", "August", "September", "October", "November", "December"]
+SCOPES = ['yearly', 'monthly', 'weekly']
+
+# Largest CSV accepted by POST /api/statements
+MAX_UPLOAD_BYTES = 200 * 1024 ** 2
+
+# Statement table rows per page by default, and the most a client may ask for
+DEFAULT_PAGE_ROWS = 200
+MAX_PAGE_ROWS = 2000
+
+# Smaller bodies are sent uncompressed
+GZIP_MIN_BYTES = 1024
+
+# Files the server hands out besides the API
+STATIC_SUFFIXES = {'.html', '.css', '.js'}
+
+
+class ApiError(Exception):
+    """A request the API refuses, with the HTTP status to answer it with."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# --- Statements ---
+class Statement:
+    """A parsed statement with the cube and forecast state the endpoints read.
+
+    version is unique per parse and keys the cached responses, so bodies
+    rendered from an evicted statement are never served for it.
+    """
+
+    _versions = itertools.count(1)
+
+    def __init__(self, df):
+        self.version = next(self._versions)
+        self.df = df
+        self.agg = aggregate_statement(df)
+        self.cube = PeriodCube(self.agg, df)
+        self.forecast_state = ForecastState.from_monthly(monthly_category_totals(self.agg))
+
+def parse_statement(data):
+    """Cleans CSV bytes with the parse_csv rules and labels waste with the default keywords."""
+    df = read_statement(io.BytesIO(data))
+    return Statement(label_waste(df, WasteMatcher(DEFAULT_WASTE_KEYWORDS)))
+
+# Parsed statements by content digest, and rendered GET bodies by statement version and request path
+STATEMENTS = LRUCache(max_entries=8, max_bytes=1024 ** 3, sizeof=lambda statement: frame_nbytes((statement.df,
+                                                                                               statement.agg)))
+RESPONSES = LRUCache(max_entries=4096, max_bytes=64 * 1024 ** 2, sizeof=lambda response: len(response.body))
+
+
+# --- Payloads ---
+def parse_period(query):
+    """(scope, year, month, week) from the query string, validated like the page selectors."""
+    scope = query.get('scope', 'monthly')
+    if scope not in SCOPES:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"scope must be one of: {', '.join(SCOPES)}")
+    try:
+        year = int(query['year'])
+        month = int(query['month']) if scope != 'yearly' else None
+        week = int(query['week']) if scope == 'weekly' else None
+    except KeyError as e:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Missing parameter {e.args[0]} for the {scope} scope") from e
+    except ValueError as e:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "year, month and week must be integers") from e
+    if month is not None and not 1 <= month <= 12 or week is not None and not 1 <= week <= 5:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "month must be 1-12 and week 1-5")
+    return scope, year, month, week
+
+def amount_pairs(frame, labels):
+    """[[label, amount], ...] with amounts rounded to cents."""
+    return [[label, amount] for label, amount in zip(labels, np.round(frame['Amount'].to_numpy(), 2).tolist())]
+
+def summary_payload(statement_id, statement):
+    latest = statement.agg.iloc[-1]
+    return {
+        'statement': statement_id,
+        'transactions': len(statement.df),
+        'years': [int(year) for year in statement.cube.years],
+        'latest': {'year': int(latest['Year']), 'month': int(latest['Month']),
+                   'week': int(get_week_of_month(latest['Day']))},
+    }
+
+def period_payload(statement, scope, year, month, week):
+    """Everything the Manage and Analyze pages show for one period, except the statement rows."""
+    cube = statement.cube
+    categories = period_aggregate(cube, 'categories', scope, year, month, week)
+    waste = period_aggregate(cube, 'waste', scope, year, month, week)
+    trend = period_aggregate(cube, 'trend', scope, year, month, week)
+    if scope == 'yearly':
+        trend_labels = [MONTH_NAMES[m - 1] for m in trend['Month'].astype(int)]
+    elif scope == 'monthly':
+        trend_labels = [f'Week {w}' for w in trend['WeekOfMonth'].astype(int)]
+    else:
+        keys = trend['DateKey'].astype(np.int64)
+        trend_labels = [f'{k // 10000:04d}-{k // 100 % 100:02d}-{k % 100:02d}' for k in keys]
+    return {
+        'scope': scope, 'year': year, 'month': month, 'week': week,
+        'max_week': int(cube.max_week(year, month)) if month else None,
+        'total': round(float(cube.total(scope, year, month, week)), 2),
+        'categories': amount_pairs(categories, categories['Category'].astype(str)),
+        'waste': amount_pairs(waste, waste['Category'].astype(str)),
+        'trend': amount_pairs(trend, trend_labels),
+        'rows': len(cube.rows(scope, year, month, week)),
+    }
+
+def transactions_payload(statement, scope, year, month, week, offset, limit):
+    """One page of the period's expense rows; next is the offset of the following page (None at the end)."""
+    rows = statement.cube.rows(scope, year, month, week)
+    page = rows.iloc[offset:offset + limit]
+    categories = page['Category'].astype(object)
+    descriptions = statement_descriptions(page).astype(object)
+    return {
+        'total': len(rows),
+        'offset': offset,
+        'next': offset + len(page) if offset + len(page) < len(rows) else None,
+        'columns': ['Date', 'Category', 'Description', 'Amount'],
+        'rows': [list(row) for row in zip(
+            page['DateObj'].dt.strftime('%Y-%m-%d').tolist(),
+            categories.where(categories.notna(), None).tolist(),
+            descriptions.where(descriptions.notna(), None).tolist(),
+            np.round(statement_amounts(page).to_numpy(dtype=np.float64), 2).tolist(),
+        )],
+    }
+
+def forecast_payload(statement):
+    results_df = statement.forecast_state.forecast()
+    if results_df is None:
+        results_df = cached_forecast(build_category_monthly(statement.agg))
+    return {
+        'columns': ['Category', 'Next Month Forecast', 'Next Year Total Forecast', 'MSE Loss'],
+        'rows': [[str(category), round(next_month, 2), round(next_year, 2), round(mse, 2)]
+                 for category, next_month, next_year, mse in results_df.itertuples(index=False)],
+        'total_next_month': round(float(results_df['Next Month Forecast'].sum()), 2),
+        'total_next_year': round(float(results_df['Next Year Total Forecast'].sum()), 2),
+    }
+
+
+# --- HTTP ---
+class Response:
+    """A rendered JSON body with its ETag and, when worth it, a gzip copy."""
+
+    def __init__(self, payload):
+        self.body = json.dumps(payload, separators=(',', ':'), allow_nan=False).encode('utf-8')
+        self.etag = f'"{content_digest(self.body)}"'
+        self.gzipped = gzip.compress(self.body, compresslevel=6) if len(self.body) >= GZIP_MIN_BYTES else None
+
+
+class ApiHandler(SimpleHTTPRequestHandler):
+    """Serves the static pages from the package directory and the JSON API under /api/."""
+
+    def end_headers(self):
+        # Lets pages opened from file:// call a server on localhost
+        self.send_header('Access-Control-Allow-Origin', '*')
+        super().end_headers()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.startswith('/api/'):
+            self._answer(lambda: self._get(url))
+        elif url.path == '/':
+            self.send_response(HTTPStatus.FOUND)
+            self.send_header('Location', '/index.html')
+            self.end_headers()
+        elif os.path.splitext(url.path)[1] in STATIC_SUFFIXES:
+            super().do_GET()
+        else:
+            self.send_error(HTTPStatus.NOT_FOUND)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip('/') != '/api/statements':
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        self._answer(self._upload)
+
+    def _answer(self, handler):
+        try:
+            response, status = handler()
+        except ApiError as e:
+            response, status = Response({'error': str(e)}), e.status
+        except Exception as e:  # Every request gets an answer; the traceback goes to the server log
+            self.log_error("Error handling %s: %r", self.path, e)
+            traceback.print_exc()
+            response, status = Response({'error': "Internal server error"}), HTTPStatus.INTERNAL_SERVER_ERROR
+        self._send(response, status)
+
+    def _upload(self):
+        try:
+            length = int(self.headers.get('Content-Length', ''))
+        except ValueError as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Content-Length must be a non-negative integer") from e
+        if length < 0:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Content-Length must be a non-negative integer")
+        if length > MAX_UPLOAD_BYTES:
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                           f"Statements larger than {MAX_UPLOAD_BYTES // 1024 ** 2} MB are not accepted")
+        data = self.rfile.read(length)
+        statement_id = content_digest(data)
+        statement = STATEMENTS.get(statement_id)
+        if statement is None:
+            try:
+                statement = parse_statement(data)
+            except StatementError as e:
+                raise ApiError(HTTPStatus.BAD_REQUEST, str(e)) from e
+            STATEMENTS.put(statement_id, statement)
+        return Response(summary_payload(statement_id, statement)), HTTPStatus.CREATED
+
+    def _get(self, url):
+        parts = url.path.strip('/').split('/')
+        if len(parts) != 4 or parts[1] != 'statements':
+            raise ApiError(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+        _, _, statement_id, endpoint = parts
+
+        statement = STATEMENTS.get(statement_id)
+        if statement is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, "Unknown statement; upload it again.")
+        cache_key = (statement.version, self.path)
+        response = RESPONSES.get(cache_key)
+        if response is not None:
+            return response, HTTPStatus.OK
+
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if endpoint == 'summary':
+            payload = summary_payload(statement_id, statement)
+        elif endpoint == 'period':
+            payload = period_payload(statement, *parse_period(query))
+        elif endpoint == 'transactions':
+            try:
+                offset = max(int(query.get('offset', 0)), 0)
+                limit = min(max(int(query.get('limit', DEFAULT_PAGE_ROWS)), 1), MAX_PAGE_ROWS)
+            except ValueError as e:
+                raise ApiError(HTTPStatus.BAD_REQUEST, "offset and limit must be integers") from e
+            payload = transactions_payload(statement, *parse_period(query), offset, limit)
+        elif endpoint == 'forecast':
+            payload = forecast_payload(statement)
+        else:
+            raise ApiError(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+
+        response = Response(payload)
+        RESPONSES.put(cache_key, response)
+        return response, HTTPStatus.OK
+
+    def _send(self, response, status):
+        gzipped = response.gzipped is not None and 'gzip' in self.headers.get('Accept-Encoding', '')
+        etag = response.etag[:-1] + '-gzip"' if gzipped else response.etag
+        if status == HTTPStatus.OK and etag in self.headers.get('If-None-Match', ''):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        body = response.gzipped if gzipped else response.body
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the SpendWise pages with a local JSON aggregate API.")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8000, help="Port to listen on (default: 8000)")
+    args = parser.parse_args(argv)
+
+    handler = partial(ApiHandler, directory=os.path.dirname(os.path.abspath(__file__)))
+    with ThreadingHTTPServer((args.host, args.port), handler) as server:
+        print(f"Serving SpendWise on http://{args.host}:{args.port}/", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
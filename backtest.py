@@ -0,0 +1,86 @@
+"""Rolling-origin backtest of the per-category linear forecasts.
+
+At every cutoff month t, each category's line is fitted on its months up
+to t, as the Predict page fits the full history, and scored on month
+t + horizon. Prefix sums of the regression statistics over a dense
+category x month grid give the fits for all cutoffs at once. The backtest
+is a few array operations instead of one fit per category and cutoff.
+"""
+import numpy as np
+import pandas as pd
+
+from forecasting import fit_linear_from_sums
+
+BACKTEST_COLUMNS = ['Category', 'Forecasts', 'MAE', 'MSE', 'MAPE (%)']
+
+
+def backtest_categories(category_monthly, horizon=1):
+    """Out-of-sample errors of the linear forecasts from every historical cutoff.
+
+    category_monthly is the output of build_category_monthly() (with 'seq').
+    A category is scored at a cutoff once it has at least 2 months of
+    history, and only at months where it has data. Forecasts are clipped at
+    0 as on the Predict page. MAPE skips months with zero actual spending.
+
+    Returns (per_category, overall). per_category has BACKTEST_COLUMNS for
+    every category with at least one scored forecast. overall is a dict
+    with the same metrics pooled over all scored forecasts.
+    """
+    empty = (pd.DataFrame(columns=BACKTEST_COLUMNS),
+             {'Forecasts': 0, 'MAE': np.nan, 'MSE': np.nan, 'MAPE (%)': np.nan})
+    if category_monthly.empty:
+        return empty
+
+    codes, categories = pd.factorize(category_monthly['Category'], sort=True)
+    columns = category_monthly['seq'].to_numpy(dtype=np.int64) - 1
+    n_months = int(columns.max()) + 1
+    if n_months <= horizon:
+        return empty
+
+    # Dense category x month grid; months without data contribute nothing to the sums
+    y = np.zeros((len(categories), n_months))
+    observed = np.zeros((len(categories), n_months), dtype=bool)
+    y[codes, columns] = category_monthly['Amount'].to_numpy(dtype=np.float64)
+    observed[codes, columns] = True
+    x = np.where(observed, np.arange(1, n_months + 1, dtype=np.float64), 0.0)
+
+    # Column t of each prefix sum holds the statistics of months 1..t+1, i.e. the fit at cutoff t+1
+    cutoffs = slice(0, n_months - horizon)
+    n = np.cumsum(observed, axis=1)[:, cutoffs].astype(np.float64)
+    slopes, intercepts = fit_linear_from_sums(
+        n,
+        np.cumsum(x, axis=1)[:, cutoffs],
+        np.cumsum(y, axis=1)[:, cutoffs],
+        np.cumsum(x * y, axis=1)[:, cutoffs],
+        np.cumsum(x * x, axis=1)[:, cutoffs],
+    )
+
+    target_seq = np.arange(1 + horizon, n_months + 1, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        forecasts = np.maximum(0, slopes * target_seq + intercepts)
+    actual = y[:, horizon:]
+    scored = observed[:, horizon:] & (n >= 2)
+
+    errors = np.where(scored, actual - forecasts, 0.0)
+    absolute = np.abs(errors)
+    with_actual = scored & (actual != 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percent = np.where(with_actual, absolute / np.abs(actual), 0.0)
+
+        counts = scored.sum(axis=1)
+        per_category = pd.DataFrame({
+            'Category': np.asarray(categories),
+            'Forecasts': counts,
+            'MAE': absolute.sum(axis=1) / counts,
+            'MSE': (errors ** 2).sum(axis=1) / counts,
+            'MAPE (%)': 100 * percent.sum(axis=1) / with_actual.sum(axis=1),
+        }, columns=BACKTEST_COLUMNS)[counts > 0].reset_index(drop=True)
+
+        total = scored.sum()
+        overall = {
+            'Forecasts': int(total),
+            'MAE': float(absolute.sum() / total) if total else np.nan,
+            'MSE': float((errors ** 2).sum() / total) if total else np.nan,
+            'MAPE (%)': float(100 * percent.sum() / with_actual.sum()) if with_actual.any() else np.nan,
+        }
+    return per_category, overall
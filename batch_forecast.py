@@ -0,0 +1,146 @@
+"""Headless batch forecasting over a directory of statement CSVs.
+
+Runs the same pipeline as the Predict page (parse_csv cleaning rules ->
+monthly category aggregate -> per-category forecast, linear by default) without
+Streamlit, fanning files out across a process pool:
+
+    python batch_forecast.py statements/ -o forecasts.jsonl --workers 8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import pandas as pd
+
+from forecasting import FORECASTERS, build_category_monthly, forecast_categories, make_forecaster
+from ingest import stream_statement
+
+OUTPUT_COLUMNS = ['file', 'category', 'next_month_forecast', 'next_year_total_forecast', 'mse', 'error']
+
+
+# --- Worker ---
+def forecast_file(path, model='linear', ridge=0.0):
+    """Forecasts one statement. Never raises: failures come back as an error record."""
+    started = time.perf_counter()
+    summary = {'file': str(path), 'bytes': 0, 'rows': 0, 'seconds': 0.0}
+    try:
+        summary['bytes'] = os.path.getsize(path)
+        agg = stream_statement(path)
+        summary['rows'] = int(agg['Count'].sum())
+
+        category_monthly = build_category_monthly(agg)
+        if category_monthly.empty:
+            records = [error_record(path, "Need at least 2 months of historical expense data in a category for prediction.")]
+        else:
+            results_df = forecast_categories(category_monthly, make_forecaster(model, ridge))
+            records = [{
+                'file': str(path),
+                'category': category,
+                'next_month_forecast': float(next_month),
+                'next_year_total_forecast': float(next_year),
+                'mse': float(mse),
+                'error': None,
+            } for category, next_month, next_year, mse in results_df.itertuples(index=False)]
+    except Exception as e:  # Isolate every failure to its own file
+        records = [error_record(path, f"{type(e).__name__}: {e}")]
+
+    summary['seconds'] = time.perf_counter() - started
+    return summary, records
+
+def error_record(path, message):
+    return {'file': str(path), 'category': None, 'next_month_forecast': None,
+            'next_year_total_forecast': None, 'mse': None, 'error': message}
+
+
+# --- Output ---
+class JsonLinesWriter:
+    """Appends records as they arrive, so memory stays flat over thousands of files."""
+
+    def __init__(self, path):
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, records):
+        for record in records:
+            self._file.write(json.dumps(record) + '\n')
+
+    def close(self):
+        self._file.close()
+
+class ParquetWriter:
+    """Collects records and writes one Parquet file at the end (needs pyarrow)."""
+
+    def __init__(self, path):
+        self._path = path
+        self._records = []
+
+    def write(self, records):
+        self._records.extend(records)
+
+    def close(self):
+        pd.DataFrame(self._records, columns=OUTPUT_COLUMNS).to_parquet(self._path, index=False)
+
+def open_writer(path):
+    return ParquetWriter(path) if Path(path).suffix == '.parquet' else JsonLinesWriter(path)
+
+
+# --- Driver ---
+def run_batch(files, output, workers=None, progress_every=100, log=sys.stderr, model='linear', ridge=0.0):
+    """Forecasts every file across a process pool and writes all results to output."""
+    writer = open_writer(output)
+    totals = {'files': 0, 'failed': 0, 'rows': 0, 'bytes': 0}
+    started = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Batch several files per task to amortize inter-process overhead
+            chunksize = max(1, len(files) // ((workers or os.cpu_count() or 1) * 16))
+            for summary, records in pool.map(partial(forecast_file, model=model, ridge=ridge), files, chunksize=chunksize):
+                writer.write(records)
+                totals['files'] += 1
+                totals['rows'] += summary['rows']
+                totals['bytes'] += summary['bytes']
+                if records and records[0]['error'] is not None:
+                    totals['failed'] += 1
+                if progress_every and totals['files'] % progress_every == 0:
+                    report_throughput(totals, time.perf_counter() - started, log)
+    finally:
+        writer.close()
+
+    report_throughput(totals, time.perf_counter() - started, log)
+    return totals
+
+def report_throughput(totals, elapsed, log):
+    elapsed = max(elapsed, 1e-9)
+    print(f"{totals['files']} files ({totals['failed']} failed), {totals['rows']} rows, "
+          f"{totals['bytes'] / 1024 ** 2:.1f} MB in {elapsed:.1f}s: "
+          f"{totals['files'] / elapsed:.1f} files/s, {totals['rows'] / elapsed:,.0f} rows/s, "
+          f"{totals['bytes'] / 1024 ** 2 / elapsed:.1f} MB/s", file=log)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Forecast category spending for every statement CSV in a directory.")
+    parser.add_argument('input_dir', help="Directory containing statement CSVs")
+    parser.add_argument('-o', '--output', default='forecasts.jsonl',
+                        help="Output file: .jsonl (default) or .parquet")
+    parser.add_argument('--pattern', default='*.csv', help="Glob pattern for statement files (default: *.csv)")
+    parser.add_argument('--recursive', action='store_true', help="Search subdirectories too")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--model', choices=sorted(FORECASTERS), default='linear',
+                        help="Forecasting model (default: linear)")
+    parser.add_argument('--ridge', type=float, default=0.0, help="Ridge penalty of the seasonal model (default: 0)")
+    args = parser.parse_args(argv)
+
+    root = Path(args.input_dir)
+    files = sorted(root.rglob(args.pattern) if args.recursive else root.glob(args.pattern))
+    if not files:
+        parser.error(f"No files matching {args.pattern} in {root}")
+
+    totals = run_batch(files, args.output, args.workers, model=args.model, ridge=args.ridge)
+    return 1 if totals['failed'] == totals['files'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""Headless benchmarks of the app's hot paths on synthetic bank statements.
+
+Times each stage the pages run (parsing, waste labelling, aggregation,
+period filters, analysis, forecasting) and records its peak traced memory,
+without starting Streamlit:
+
+    python benchmark.py --sizes 10k,1M,10M -o bench.json
+    python benchmark.py --sizes 10k,1M --baseline bench.json --tolerance 0.25
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from aggregates import aggregate_statement
+from anomaly import AnomalyDetector
+from backtest import backtest_categories
+from cube import PeriodCube
+from forecasting import (ForecastState, build_category_monthly, cached_forecast, forecast_categories,
+                         monthly_category_totals)
+from ingest import read_statement, stream_statement
+from waste import DEFAULT_WASTE_KEYWORDS, WasteMatcher
+
+DEFAULT_SIZES = '10k,1M,10M'
+
+# Rows generated per block when writing a synthetic statement to disk
+GENERATOR_CHUNK_ROWS = 1_000_000
+
+# Slowdowns under this many seconds are treated as timer noise
+NOISE_FLOOR_SECONDS = 0.005
+
+
+# --- Synthetic Statements ---
+MERCHANT_WORDS = ['Market', 'Fuel', 'Pharmacy', 'Books', 'Hardware', 'Bakery', 'Cinema', 'Gym',
+                  'Electric', 'Water', 'Telecom', 'Insurance', 'Airline', 'Hotel', 'Garden', 'Pet']
+
+def generate_statement(rows, years=3, categories=20, descriptions=200, dirty_share=0.3, seed=0,
+                       end_date='2024-12-31'):
+    """Random statement with the upload's raw columns: Date, Category, Description and Amount strings.
+
+    Categories mix generic names with the excluded and waste categories the
+    pages special-case; descriptions mix merchant names with waste keywords.
+    A dirty_share of the amounts use formats like "$1,234.50" or "1,234.50 USD".
+    """
+    rng = np.random.default_rng(seed)
+
+    category_names = np.array([f'Category {i}' for i in range(categories)]
+                              + ['Income', 'Savings', 'Transfer', 'Dining Out', 'Pub', 'Entertainment'])
+    merchants = np.array([f'{MERCHANT_WORDS[i % len(MERCHANT_WORDS)]} {i}' for i in range(descriptions)]
+                         + ['Swiggy order', 'Uber trip', 'Zomato', 'Coffee house', 'Corner bar'])
+
+    end = pd.Timestamp(end_date)
+    days = (end - (end - pd.DateOffset(years=years))).days
+    dates = end - pd.to_timedelta(rng.integers(0, days, rows), unit='D')
+
+    amounts = np.round(rng.lognormal(3.5, 1.0, rows), 2)
+    amounts[rng.random(rows) < 0.1] *= -1  # Refunds and income
+    amount_text = pd.Series(amounts).map('{:.2f}'.format)
+    dirty = rng.random(rows) < dirty_share
+    dollar = dirty & (rng.random(rows) < 0.5)
+    amount_text[dollar] = pd.Series(amounts[dollar]).map('${:,.2f}'.format).to_numpy()
+    suffixed = dirty & ~dollar
+    amount_text[suffixed] = pd.Series(amounts[suffixed]).map('{:,.2f} USD'.format).to_numpy()
+
+    return pd.DataFrame({
+        'Date': dates.strftime('%Y-%m-%d'),
+        'Category': category_names[rng.integers(0, len(category_names), rows)],
+        'Description': merchants[rng.integers(0, len(merchants), rows)],
+        'Amount': amount_text,
+    })
+
+def write_statement(path, rows, seed=0, chunk_rows=GENERATOR_CHUNK_ROWS, **options):
+    """Writes a synthetic statement CSV block by block, so 10M rows never sit in memory at once."""
+    with open(path, 'w', encoding='utf-8', newline='') as out:
+        for index, start in enumerate(range(0, rows, chunk_rows)):
+            block = generate_statement(min(chunk_rows, rows - start), seed=seed + index, **options)
+            block.to_csv(out, index=False, header=(index == 0))
+    return path
+
+
+# --- Measurement ---
+def measure(fn, repeat=3):
+    """Best and mean wall time over repeat runs, then peak traced memory from one extra run.
+
+    Memory is traced separately because tracemalloc slows the timed code.
+    """
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': min(timings), 'mean_seconds': sum(timings) / len(timings), 'peak_mb': peak / 1024 ** 2}
+
+def parse_size(text):
+    """Row count from '10k', '1M', '2.5M' or a plain integer."""
+    text = text.strip().lower()
+    scale = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+# --- Stages ---
+def sample_period(agg):
+    """Year, month and week of the latest transaction, as the Home page selects them."""
+    latest = agg.iloc[-1]
+    return int(latest['Year']), int(latest['Month']), int(latest['WeekOfMonth'])
+
+def bench_stages(path, repeat):
+    """Yields (stage, measurement) for every hot path on one statement file.
+
+    Each stage is fed the output of the one before, as in the app: the
+    parsed frame is labelled, aggregated, indexed by the cube, then queried.
+    """
+    yield 'parse_csv', measure(lambda: read_statement(path), repeat)
+    yield 'stream_statement', measure(lambda: stream_statement(path), repeat)
+
+    df = read_statement(path)
+    matcher = WasteMatcher(DEFAULT_WASTE_KEYWORDS)
+    yield 'waste_labels', measure(lambda: matcher.classify(df), repeat)
+    df['Waste'] = matcher.classify(df)
+    yield 'anomaly_scores', measure(lambda: AnomalyDetector().update(df), repeat)
+
+    yield 'aggregate', measure(lambda: aggregate_statement(df), repeat)
+    agg = aggregate_statement(df)
+    yield 'cube_build', measure(lambda: PeriodCube(agg, df), repeat)
+    cube = PeriodCube(agg, df)
+
+    year, month, week = sample_period(agg)
+    scopes = [('all', None, None, None), ('yearly', year, None, None),
+              ('monthly', year, month, None), ('weekly', year, month, week)]
+    for scope, *period in scopes:
+        yield f'filter_data[{scope}]', measure(lambda: cube.rows(scope, *period), repeat)
+    for scope, *period in scopes[1:]:
+        def analyze():
+            cube.total(scope, *period)
+            cube.category_totals(scope, *period)
+            cube.category_totals(scope, *period, waste_only=True)
+            cube.trend(scope, *period)
+        yield f'analyze[{scope}]', measure(analyze, repeat)
+
+    yield 'predict_refit', measure(lambda: forecast_categories(build_category_monthly(agg)), repeat)
+    cached_forecast(build_category_monthly(agg))
+    yield 'predict_cached', measure(lambda: cached_forecast(build_category_monthly(agg)), repeat)
+    state = ForecastState.from_monthly(monthly_category_totals(agg))
+    yield 'predict_state', measure(state.forecast, repeat)
+    yield 'backtest', measure(lambda: backtest_categories(build_category_monthly(agg)), repeat)
+
+def run_benchmarks(sizes, repeat=3, workdir=None, seed=0, log=sys.stderr, **generator_options):
+    """Generates one statement per size and benchmarks every stage on it."""
+    results = []
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for rows in sizes:
+            path = Path(tmp) / f'statement_{rows}.csv'
+            started = time.perf_counter()
+            write_statement(path, rows, seed=seed, **generator_options)
+            print(f"{rows:,} rows: generated {path.stat().st_size / 1024 ** 2:.1f} MB "
+                  f"in {time.perf_counter() - started:.1f}s", file=log)
+
+            for stage, measurement in bench_stages(path, repeat):
+                results.append({'rows': rows, 'stage': stage, **measurement})
+                print(f"  {stage:<24} {measurement['seconds'] * 1000:10.2f} ms "
+                      f"{measurement['peak_mb']:10.1f} MB peak", file=log)
+            path.unlink()
+
+    return {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'repeat': repeat,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+# --- Baseline Comparison ---
+def compare_to_baseline(report, baseline, tolerance=0.25, memory_tolerance=0.25):
+    """Regressions against a stored baseline report.
+
+    A stage regresses when its best time grows by more than tolerance (and
+    by more than the noise floor), or its peak memory by more than
+    memory_tolerance. Stages missing from the baseline are skipped.
+    """
+    previous = {(r['rows'], r['stage']): r for r in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        before = previous.get((result['rows'], result['stage']))
+        if before is None:
+            continue
+        slower = result['seconds'] > before['seconds'] * (1 + tolerance)
+        if slower and result['seconds'] - before['seconds'] > NOISE_FLOOR_SECONDS:
+            regressions.append({'rows': result['rows'], 'stage': result['stage'], 'metric': 'seconds',
+                                'baseline': before['seconds'], 'current': result['seconds']})
+        if result['peak_mb'] > before['peak_mb'] * (1 + memory_tolerance) + 1:
+            regressions.append({'rows': result['rows'], 'stage': result['stage'], 'metric': 'peak_mb',
+                                'baseline': before['peak_mb'], 'current': result['peak_mb']})
+    return regressions
+
+
+# --- Driver ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the app's hot paths on synthetic statements.")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help=f"Comma-separated row counts (default: {DEFAULT_SIZES})")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per stage; the best is reported (default: 3)")
+    parser.add_argument('--years', type=int, default=3, help="Years of history per statement (default: 3)")
+    parser.add_argument('--categories', type=int, default=20, help="Generic categories (default: 20)")
+    parser.add_argument('--descriptions', type=int, default=200, help="Distinct merchant descriptions (default: 200)")
+    parser.add_argument('--dirty-share', type=float, default=0.3,
+                        help="Share of amounts written as '$1,234.50' or '1,234.50 USD' (default: 0.3)")
+    parser.add_argument('--seed', type=int, default=0, help="Generator seed (default: 0)")
+    parser.add_argument('--workdir', default=None, help="Directory for the generated CSVs (default: system temp)")
+    parser.add_argument('-o', '--output', default=None, help="Write the JSON report here")
+    parser.add_argument('--baseline', default=None, help="JSON report to compare against; regressions exit with 1")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown ratio (default: 0.25)")
+    parser.add_argument('--memory-tolerance', type=float, default=0.25,
+                        help="Allowed peak memory growth ratio (default: 0.25)")
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(size) for size in args.sizes.split(',') if size.strip()]
+    report = run_benchmarks(sizes, repeat=args.repeat, workdir=args.workdir, seed=args.seed, years=args.years,
+                            categories=args.categories, descriptions=args.descriptions,
+                            dirty_share=args.dirty_share)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding='utf-8')
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        regressions = compare_to_baseline(report, baseline, args.tolerance, args.memory_tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['rows']:,} rows {r['stage']} {r['metric']}: "
+                  f"{r['baseline']:.4g} -> {r['current']:.4g}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("No regressions against the baseline.", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def content_digest(data):
+    """Hex digest of raw bytes, used as the cache identity of an upload."""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def frame_nbytes(value):
+    """Approximate in-memory size of a cached value (deep for DataFrames)."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, (tuple, list)):
+        return sum(frame_nbytes(item) for item in value)
+    return 0
+
+
+# --- Process-wide LRU Cache ---
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and total bytes.
+
+    Lives at module level, so every Streamlit session in the process shares it.
+    Keeps hit/miss/eviction counters for the UI.
+    """
+
+    def __init__(self, max_entries=8, max_bytes=512 * 1024 ** 2, sizeof=frame_nbytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return  # Never let a single oversized value flush the whole cache
+        evicted = []
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+                evicted_key, (evicted_value, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+                evicted.append((evicted_key, evicted_value))
+        if evicted:
+            self._evicted(evicted)
+
+    def _evicted(self, entries):
+        """Called with the evicted (key, value) pairs, outside the lock."""
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class SpillingLRUCache(LRUCache):
+    """LRUCache of DataFrames that spills evicted entries to a directory.
+
+    Keys must be digests (they become file names). With directory set,
+    evicted frames are written there as JSON and a memory miss looks for
+    them on disk before counting as a miss, so entries survive eviction and
+    restarts and are shared by every process using the directory. Spilled
+    files are never removed; the directory is the operator's to clean.
+    """
+
+    def __init__(self, directory=None, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = directory
+        self.disk_hits = 0
+        self.spills = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.json')
+
+    def get(self, key):
+        value = super().get(key)
+        if value is not None or not self.directory:
+            return value
+        try:
+            with open(self._path(key), encoding='utf-8') as spilled:
+                payload = json.load(spilled)
+            value = pd.DataFrame(payload['data'], columns=payload['columns'])
+        except (OSError, ValueError, KeyError):  # Not spilled, or a partial file from a crash
+            return None
+        with self._lock:
+            self.misses -= 1
+            self.disk_hits += 1
+        self.put(key, value)
+        return value
+
+    def _evicted(self, entries):
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        for key, value in entries:
+            path = self._path(key)
+            if os.path.exists(path):
+                continue
+            # Written under a temporary name, so other processes never read a partial file
+            temporary = f'{path}.{uuid.uuid4().hex}.tmp'
+            try:
+                with open(temporary, 'w', encoding='utf-8') as out:
+                    # Python floats serialize exactly, so a spilled frame reads back unchanged
+                    json.dump({'columns': list(value.columns), 'data': value.to_numpy(dtype=object).tolist()},
+                              out, default=str)
+                os.replace(temporary, path)
+            except OSError:
+                continue  # A failed spill only loses the entry, as a plain LRU would
+            finally:
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+            with self._lock:
+                self.spills += 1
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock:
+            stats.update(disk_hits=self.disk_hits, spills=self.spills)
+        return stats
+
+
+# Parsed statements keyed by (content digest, parser version)
+PARSE_CACHE = LRUCache(max_entries=8, max_bytes=512 * 1024 ** 2)
+
+# Forecast tables keyed by forecasting.forecast_fingerprint(); forecast tables are
+# a few KB, so this holds hundreds of statements and model settings
+FORECAST_CACHE = SpillingLRUCache(max_entries=512, max_bytes=64 * 1024 ** 2)
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from aggregates import EXCLUDED_CATEGORIES, statement_amounts
+
+
+def date_key(year, month, day):
+    """Sortable integer key YYYYMMDD for date parts (scalars or arrays)."""
+    if np.ndim(year):
+        # Widen first: compact statements store the date parts as int8/int16
+        return (np.asarray(year, dtype=np.int64) * 10000 + np.asarray(month, dtype=np.int64) * 100
+                + np.asarray(day, dtype=np.int64))
+    return int(year) * 10000 + int(month) * 100 + int(day)
+
+def period_key_range(scope, year, month, week):
+    """Inclusive (first, last) date keys of the selected scope and period."""
+    if not year:
+        return 0, 99999999
+    if scope in ['monthly', 'weekly'] and month:
+        if scope == 'weekly' and week:
+            return date_key(year, month, (week - 1) * 7 + 1), date_key(year, month, week * 7)
+        return date_key(year, month, 1), date_key(year, month, 31)
+    return date_key(year, 1, 1), date_key(year, 12, 31)
+
+
+# --- Period/Category Cube ---
+class PeriodCube:
+    """Expense totals by Year x Month x WeekOfMonth x Day x Category, plus a sorted row index.
+
+    Built once per upload from the aggregate. Every period (year, month or
+    week) is a contiguous date-key range of the sorted arrays, so totals,
+    category splits, trends and row-level detail are a binary search plus a
+    bincount or slice, never a scan and copy of the full statement.
+    """
+
+    def __init__(self, agg, df=None):
+        expense = agg[agg['Positive'] & ~agg['Category'].isin(EXCLUDED_CATEGORIES)]
+        # The aggregate is sorted by (Year, Month, WeekOfMonth, Day), hence by date key
+        self._keys = date_key(expense['Year'], expense['Month'], expense['Day'])
+        self._months = expense['Month'].to_numpy()
+        self._weeks = expense['WeekOfMonth'].to_numpy()
+        self._cents = expense['Cents'].to_numpy(dtype=np.int64)
+        self._waste = expense['Waste'].to_numpy(dtype=bool)
+        self._codes, categories = pd.factorize(expense['Category'], sort=True)
+        self.categories = np.asarray(categories, dtype=object)
+
+        self.years = sorted(agg['Year'].unique(), reverse=True)
+        self._max_week = agg.groupby(['Year', 'Month'])['WeekOfMonth'].max().to_dict()
+
+        # Row-level index: the statement is sorted by DateObj, so its date keys are sorted too
+        self._rows = df if df is not None and not df.empty else None
+        self._row_keys = None
+        if self._rows is not None:
+            self._row_keys = date_key(df['Year'], df['Month'], df['Day'])
+
+    def _bounds(self, keys, scope, year, month, week):
+        first, last = period_key_range(scope, year, month, week)
+        return np.searchsorted(keys, first, 'left'), np.searchsorted(keys, last, 'right')
+
+    def max_week(self, year, month):
+        """Last week number with any transaction in the month (5 when unknown)."""
+        return self._max_week.get((year, month), 5)
+
+    def total(self, scope, year, month, week):
+        start, stop = self._bounds(self._keys, scope, year, month, week)
+        return self._cents[start:stop].sum() / 100
+
+    def category_totals(self, scope, year, month, week, waste_only=False):
+        """Category/Amount frame for the period, largest first."""
+        start, stop = self._bounds(self._keys, scope, year, month, week)
+        codes = self._codes[start:stop]
+        keep = codes >= 0  # Uncategorised rows count toward totals but not splits
+        if waste_only:
+            keep &= self._waste[start:stop]
+        codes, cents = codes[keep], self._cents[start:stop][keep]
+
+        present = np.bincount(codes, minlength=len(self.categories)) > 0
+        sums = np.bincount(codes, weights=cents, minlength=len(self.categories))[present]
+        order = np.argsort(-sums, kind='stable')
+        return pd.DataFrame({'Category': self.categories[present][order], 'Amount': sums[order] / 100})
+
+    def trend(self, scope, year, month, week):
+        """Spending per Month (yearly), WeekOfMonth (monthly) or DateKey (weekly) in the period."""
+        start, stop = self._bounds(self._keys, scope, year, month, week)
+        column, values = {
+            'yearly': ('Month', self._months),
+            'monthly': ('WeekOfMonth', self._weeks),
+        }.get(scope, ('DateKey', self._keys))
+        window, cents = values[start:stop].astype(np.int64), self._cents[start:stop]
+        if len(window) == 0:
+            return pd.DataFrame({column: [], 'Amount': []})
+        # Offsets from the first period are small (months, weeks or days), so bincount beats a sort
+        base = window.min()
+        present = np.bincount(window - base) > 0
+        sums = np.bincount(window - base, weights=cents)[present]
+        return pd.DataFrame({column: np.flatnonzero(present) + base, 'Amount': sums / 100})
+
+    @property
+    def has_rows(self):
+        """Whether row-level detail is kept (streamed statements keep none)."""
+        return self._rows is not None
+
+    def rows(self, scope, year, month, week):
+        """Row-level expense transactions of the period, sliced by date index range."""
+        if self._rows is None:
+            return pd.DataFrame()
+        start, stop = self._bounds(self._row_keys, scope, year, month, week)
+        window = self._rows.iloc[start:stop]
+        return window[(statement_amounts(window) > 0) & ~window['Category'].isin(EXCLUDED_CATEGORIES)]
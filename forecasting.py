@@ -0,0 +1,347 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from aggregates import EXCLUDED_CATEGORIES
+from caching import FORECAST_CACHE, content_digest
+
+FORECAST_COLUMNS = ['Category', 'Next Month Forecast', 'Next Year Total Forecast', 'MSE Loss']
+
+# Months projected forward: the yearly total sums these monthly forecasts
+FORECAST_HORIZON = 12
+
+
+# --- Batched Linear Regression ---
+def fit_linear_grouped(codes, x, y, n_groups):
+    """Fits y = mx + b for every group at once from grouped sufficient statistics.
+
+    `codes` assigns each (x, y) point to a group in [0, n_groups). Returns
+    (slopes, intercepts, counts) as arrays of length n_groups. Groups whose x
+    values have no spread fall back to m = 0, b = mean(y), like the old
+    np.polyfit loop did on LinAlgError.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    n = np.bincount(codes, minlength=n_groups).astype(np.float64)
+    sum_x = np.bincount(codes, weights=x, minlength=n_groups)
+    sum_y = np.bincount(codes, weights=y, minlength=n_groups)
+    sum_xy = np.bincount(codes, weights=x * y, minlength=n_groups)
+    sum_xx = np.bincount(codes, weights=x * x, minlength=n_groups)
+    slopes, intercepts = fit_linear_from_sums(n, sum_x, sum_y, sum_xy, sum_xx)
+    return slopes, intercepts, n
+
+
+def fit_linear_from_sums(n, sum_x, sum_y, sum_xy, sum_xx):
+    """Least-squares slopes and intercepts from per-group sufficient statistics."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_x = sum_x / n
+        mean_y = sum_y / n
+        # Centered moments keep the solve stable for large sequence numbers
+        s_xx = sum_xx - sum_x * mean_x
+        s_xy = sum_xy - sum_x * mean_y
+        slopes = s_xy / s_xx
+
+    degenerate = (n < 2) | ~(s_xx > 1e-12 * np.maximum(sum_xx, 1.0))
+    slopes = np.where(degenerate, 0.0, slopes)
+    intercepts = np.where(n > 0, mean_y - slopes * np.where(degenerate, 0.0, mean_x), np.nan)
+    return slopes, intercepts
+
+
+def grouped_mse(codes, x, y, slopes, intercepts, counts):
+    """Mean squared residual of each group's fitted line, in one vectorized pass."""
+    codes = np.asarray(codes, dtype=np.int64)
+    residuals = np.asarray(y, dtype=np.float64) - (slopes[codes] * np.asarray(x, dtype=np.float64) + intercepts[codes])
+    sse = np.bincount(codes, weights=residuals ** 2, minlength=len(counts))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return sse / counts
+
+
+# --- Category Forecasting (prediction.js logic) ---
+def monthly_category_totals(agg):
+    """Rolls the period/category aggregate up to expense Amount per (Year, Month, Category)."""
+    category_monthly = agg[~agg['Category'].isin(EXCLUDED_CATEGORIES)]
+    category_monthly = category_monthly.groupby(['Year', 'Month', 'Category'])['Cents'].sum().reset_index()
+    category_monthly['Amount'] = category_monthly.pop('Cents') / 100
+    return category_monthly
+
+def build_category_monthly(agg):
+    """Monthly category totals of the aggregate with a global 'seq' month number (1 = oldest month)."""
+    return number_category_months(monthly_category_totals(agg))
+
+def number_category_months(category_monthly):
+    """Adds the 'seq' month number to monthly category totals.
+
+    Only categories with at least 2 months of data are kept, and only their
+    months are numbered.
+    """
+    # Filter out categories with less than 2 months of data for trend calculation
+    month_counts = category_monthly['Category'].value_counts()
+    valid_categories = month_counts[month_counts >= 2].index
+    category_monthly = category_monthly[category_monthly['Category'].isin(valid_categories)]
+
+    # Create a global sequence number over the months that remain
+    monthly_map = category_monthly[['Year', 'Month']].drop_duplicates().sort_values(['Year', 'Month'])
+    monthly_map['seq'] = np.arange(1, len(monthly_map) + 1)
+    return pd.merge(category_monthly, monthly_map, on=['Year', 'Month'])
+
+
+def forecast_categories(category_monthly, forecaster=None):
+    """Fits every category in one batched pass and projects it forward.
+
+    forecaster defaults to LinearForecaster. Returns a DataFrame sorted by
+    Category with the 'Next Month Forecast', 'Next Year Total Forecast' and
+    'MSE Loss' columns shown on the Predict page.
+    """
+    if category_monthly.empty:
+        return pd.DataFrame(columns=FORECAST_COLUMNS)
+    forecaster = forecaster or LinearForecaster()
+    categories, forecasts, mse = forecaster.fit_predict(category_monthly, FORECAST_HORIZON)
+    return forecast_table(categories, forecasts, mse)
+
+def forecast_fingerprint(category_monthly, forecaster):
+    """Digest of the monthly category series and the forecaster's type and settings.
+
+    Statements with the same monthly totals per category share a
+    fingerprint, however their transactions differ.
+    """
+    series = category_monthly[['Year', 'Month', 'Category', 'seq', 'Amount']]
+    config = json.dumps([type(forecaster).__name__, vars(forecaster), FORECAST_HORIZON], sort_keys=True)
+    hashes = pd.util.hash_pandas_object(series, index=False).to_numpy()
+    return content_digest(hashes.tobytes() + config.encode('utf-8'))
+
+def cached_forecast(category_monthly, forecaster=None, cache=FORECAST_CACHE):
+    """forecast_categories() through the process-wide forecast cache.
+
+    Returns a copy, so callers may add display columns.
+    """
+    forecaster = forecaster or LinearForecaster()
+    key = forecast_fingerprint(category_monthly, forecaster)
+    results_df = cache.get(key)
+    if results_df is None:
+        results_df = forecast_categories(category_monthly, forecaster)
+        cache.put(key, results_df)
+    return results_df.copy()
+
+def project_forecasts(categories, m, b, mse, next_sequence):
+    """Builds the results table from fitted lines; next_sequence is the first future month."""
+    future = next_sequence + np.arange(FORECAST_HORIZON)
+    return forecast_table(categories, m[:, None] * future + b[:, None], mse)
+
+def forecast_table(categories, forecasts, mse):
+    """Results table from a (categories x months) array of monthly forecasts.
+
+    Each month is clipped at 0. The yearly total is the sum of the first 12
+    monthly forecasts.
+    """
+    monthly = np.maximum(0, forecasts)
+    return pd.DataFrame({
+        'Category': categories,
+        'Next Month Forecast': monthly[:, 0],
+        'Next Year Total Forecast': monthly[:, :12].sum(axis=1),
+        'MSE Loss': mse,
+    }, columns=FORECAST_COLUMNS)
+
+
+# --- Forecasters ---
+# A forecaster's fit_predict(category_monthly, horizon) fits every category of
+# build_category_monthly() output together and returns (categories, forecasts,
+# mse): the sorted category names, a (categories x horizon) array of monthly
+# forecasts starting at the month after the last one, and the in-sample MSE.
+
+class LinearForecaster:
+    """y = mx + b on the month sequence, per category (prediction.js logic). The default model."""
+
+    name = 'Linear trend'
+
+    def fit_predict(self, category_monthly, horizon):
+        codes, categories = pd.factorize(category_monthly['Category'], sort=True)
+        x = category_monthly['seq'].to_numpy(dtype=np.float64)
+        y = category_monthly['Amount'].to_numpy(dtype=np.float64)
+
+        m, b, n = fit_linear_grouped(codes, x, y, len(categories))
+        mse = grouped_mse(codes, x, y, m, b, n)
+        future = x.max() + 1 + np.arange(horizon)
+        return np.asarray(categories), m[:, None] * future + b[:, None], mse
+
+class SeasonalForecaster:
+    """Trend plus month-of-year dummies, with an optional ridge penalty, for all categories at once.
+
+    The design matrix has an intercept, the month sequence and 11 dummies for
+    February..December (January is the baseline). Every category's normal
+    equations are accumulated with bincount, one design column pair at a
+    time, and all of them are solved in one stacked pseudo-inverse call.
+    The ridge penalty applies to every coefficient except the intercept.
+    Months a category never saw keep a 0 effect. Categories with fewer than
+    min_seasonal_months of data get the plain trend line.
+    """
+
+    name = 'Trend + seasonality'
+
+    def __init__(self, ridge=0.0, min_seasonal_months=24):
+        self.ridge = ridge
+        self.min_seasonal_months = min_seasonal_months
+
+    @staticmethod
+    def design(x, month_index, seasonal):
+        """Design rows for sequence x and month_index 0..11, without dummies where seasonal is False."""
+        dummies = (month_index[..., None] == np.arange(1, 12)) & seasonal[..., None]
+        return np.concatenate([np.ones(x.shape + (1,)), x[..., None], dummies], axis=-1)
+
+    def fit_predict(self, category_monthly, horizon):
+        codes, categories = pd.factorize(category_monthly['Category'], sort=True)
+        n_categories = len(categories)
+        x = category_monthly['seq'].to_numpy(dtype=np.float64)
+        y = category_monthly['Amount'].to_numpy(dtype=np.float64)
+        month_index = category_monthly['Month'].to_numpy(dtype=np.int64) - 1
+
+        counts = np.bincount(codes, minlength=n_categories)
+        seasonal = counts >= self.min_seasonal_months
+        X = self.design(x, month_index, seasonal[codes])
+        p = X.shape[1]
+
+        gram = np.empty((n_categories, p, p))
+        moments = np.empty((n_categories, p))
+        for i in range(p):
+            moments[:, i] = np.bincount(codes, weights=X[:, i] * y, minlength=n_categories)
+            for j in range(i, p):
+                gram[:, i, j] = gram[:, j, i] = np.bincount(codes, weights=X[:, i] * X[:, j],
+                                                           minlength=n_categories)
+        gram += np.diag(np.r_[0.0, np.full(p - 1, self.ridge)])
+        beta = np.einsum('cij,cj->ci', np.linalg.pinv(gram), moments)
+
+        residuals = y - np.einsum('ni,ni->n', X, beta[codes])
+        mse = np.bincount(codes, weights=residuals ** 2, minlength=n_categories) / counts
+
+        # Future months continue both the sequence and the calendar from the last month
+        last = np.argmax(x)
+        future_x = x[last] + 1 + np.arange(horizon)
+        future_months = (month_index[last] + 1 + np.arange(horizon)) % 12
+        future = self.design(np.broadcast_to(future_x, (n_categories, horizon)),
+                             np.broadcast_to(future_months, (n_categories, horizon)),
+                             np.broadcast_to(seasonal[:, None], (n_categories, horizon)))
+        return np.asarray(categories), np.einsum('chp,cp->ch', future, beta), mse
+
+FORECASTERS = {'linear': LinearForecaster, 'seasonal': SeasonalForecaster}
+
+def make_forecaster(model='linear', ridge=0.0):
+    """Forecaster by name; ridge only applies to the seasonal model."""
+    if model == 'seasonal':
+        return SeasonalForecaster(ridge=ridge)
+    return FORECASTERS[model]()
+
+
+# --- Incremental Forecast State ---
+class ForecastState:
+    """Per-category regression sufficient statistics plus the month-sequence mapping.
+
+    Built once from the monthly category totals, then updated in O(new rows)
+    as later months arrive, so forecasts never need the full history again.
+    update() refuses data for a month it has already seen (a duplicate or
+    out-of-order month), and the caller rebuilds from the full series.
+    """
+
+    def __init__(self):
+        self.months = []  # (Year, Month) in sequence order, seq = position + 1
+        self.categories = []
+        self._codes = {}
+        # Rows: n, sum_x, sum_y, sum_xy, sum_xx, sum_yy; one column per category
+        self.stats = np.zeros((6, 0))
+        self.first_seq = np.zeros(0)
+        # Points per month from categories with >= 2 months (the ones a full refit numbers)
+        self.valid_points = np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def from_monthly(cls, monthly):
+        state = cls()
+        state.update(monthly)
+        return state
+
+    def update(self, monthly):
+        """Folds in monthly category totals for months after the last one seen.
+
+        Returns False, leaving the state untouched, if any month is not new.
+        """
+        if monthly.empty:
+            return True
+        new_months = sorted(set(zip(monthly['Year'].tolist(), monthly['Month'].tolist())))
+        if self.months and new_months[0] <= self.months[-1]:
+            return False
+
+        seq_of = {month: len(self.months) + i + 1 for i, month in enumerate(new_months)}
+        self.months.extend(new_months)
+        self.valid_points = np.concatenate([self.valid_points, np.zeros(len(new_months), dtype=np.int64)])
+
+        for category in monthly['Category'].unique():
+            if category not in self._codes:
+                self._codes[category] = len(self.categories)
+                self.categories.append(category)
+        grow = len(self.categories) - self.stats.shape[1]
+        self.stats = np.hstack([self.stats, np.zeros((6, grow))])
+        self.first_seq = np.concatenate([self.first_seq, np.full(grow, np.inf)])
+
+        codes = monthly['Category'].map(self._codes).to_numpy(dtype=np.int64)
+        x = np.array([seq_of[month] for month in zip(monthly['Year'].tolist(), monthly['Month'].tolist())],
+                     dtype=np.float64)
+        y = monthly['Amount'].to_numpy(dtype=np.float64)
+
+        n_before = self.stats[0].copy()
+        for row, values in enumerate([np.ones_like(x), x, y, x * y, x * x, y * y]):
+            np.add.at(self.stats[row], codes, values)
+        np.minimum.at(self.first_seq, codes, x)
+
+        # A category's months start counting once it has two; promote its first month then
+        n_after = self.stats[0]
+        counted = n_after[codes] >= 2
+        np.add.at(self.valid_points, x[counted].astype(np.int64) - 1, 1)
+        promoted = (n_before == 1) & (n_after >= 2)
+        np.add.at(self.valid_points, self.first_seq[promoted].astype(np.int64) - 1, 1)
+        return True
+
+    def forecast(self):
+        """Results table straight from the statistics.
+
+        Returns None when some month has spending only from single-month
+        categories: a full refit would not number that month, so the caller
+        must refit to get the same answer.
+        """
+        n, sum_x, sum_y, sum_xy, sum_xx, sum_yy = self.stats
+        valid = n >= 2
+        if not valid.any():
+            return pd.DataFrame(columns=FORECAST_COLUMNS)
+        if (self.valid_points == 0).any():
+            return None
+
+        categories = np.asarray(self.categories, dtype=object)[valid]
+        n, sum_x, sum_y, sum_xy, sum_xx, sum_yy = self.stats[:, valid]
+        m, b = fit_linear_from_sums(n, sum_x, sum_y, sum_xy, sum_xx)
+        # Centered residual sum of squares: S_yy - m * S_xy
+        sse = (sum_yy - sum_y ** 2 / n) - m * (sum_xy - sum_x * sum_y / n)
+        mse = np.maximum(sse, 0) / n
+
+        order = np.argsort(categories, kind='stable')
+        return project_forecasts(categories[order], m[order], b[order], mse[order], len(self.months) + 1)
+
+    def to_json(self):
+        """Serializes the state so it can be persisted between sessions."""
+        return json.dumps({
+            'months': self.months,
+            'categories': [c.item() if isinstance(c, np.generic) else c for c in self.categories],
+            'stats': self.stats.tolist(),
+            'first_seq': self.first_seq.tolist(),
+            'valid_points': self.valid_points.tolist(),
+        })
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        state = cls()
+        state.months = [tuple(month) for month in data['months']]
+        state.categories = data['categories']
+        state._codes = {category: code for code, category in enumerate(state.categories)}
+        state.stats = np.array(data['stats'], dtype=np.float64).reshape(6, -1)
+        state.first_seq = np.array(data['first_seq'], dtype=np.float64)
+        state.valid_points = np.array(data['valid_points'], dtype=np.int64)
+        return state
@@ -1,37 +1,8 @@
-// index.js (UPDATED parseCSV function)
+// index.js (uploads the CSV to the local API)
 
 const fileInput = document.getElementById('fileInput');
 const uploadBtn = document.getElementById('uploadBtn');
 
-// Simple CSV to Array of Objects parser
-function parseCSV(csvText) {
-    const lines = csvText.trim().split('\n');
-    const headers = lines[0].split(',').map(h => h.trim());
-    const data = [];
-
-    for (let i = 1; i < lines.length; i++) {
-        const values = lines[i].split(',').map(v => v.trim());
-        if (values.length === headers.length) {
-            let obj = {};
-            headers.forEach((header, index) => {
-                let value = values[index];
-                
-                // *** CRITICAL FIX FOR NaN: Clean and convert Amount at the source ***
-                if (header.toLowerCase() === 'amount') {
-                    // Remove currency symbols, commas, and clean whitespace
-                    let cleanedValue = value.replace(/[^0-9.-]/g, ''); 
-                    obj[header] = parseFloat(cleanedValue) || 0; // Use 0 if final parse fails
-                } else {
-                    obj[header] = value;
-                }
-            });
-            data.push(obj);
-        }
-    }
-    return data;
-}
-
-
 // Enable button only when a file is selected
 fileInput.addEventListener('change', () => {
     uploadBtn.disabled = !fileInput.files.length;
@@ -48,16 +19,15 @@ uploadBtn.addEventListener('click', () => {
 
         if(file.name.endsWith(".csv")) {
             const reader = new FileReader();
-            reader.onload = (e) => {
+            reader.onload = async (e) => {
                 try {
-                    // PARSE CSV and save as JSON string
-                    const dataArray = parseCSV(e.target.result);
-                    localStorage.setItem("bankData", JSON.stringify(dataArray));
-                    
+                    // The local API parses and aggregates the CSV; only its statement id is kept
+                    await apiUpload(e.target.result);
+
                     // Redirect to analysis page
                     window.location.href = "analysis.html";
                 } catch (error) {
-                    alert("Error parsing CSV file.");
+                    alert(`Error uploading CSV file: ${error.message}`);
                 }
             };
             reader.readAsText(file);
@@ -0,0 +1,245 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from aggregates import StatementAggregator, statement_cents, statement_descriptions
+from waste import label_waste
+
+REQUIRED_COLUMNS = ['Date', 'Category', 'Amount']
+
+# Rows per chunk when streaming a statement instead of loading it whole
+STREAM_CHUNK_ROWS = 200_000
+
+# Leading rows, and distinct Date strings among them, used to detect the date format
+DATE_SAMPLE_ROWS = 1000
+DATE_SAMPLE_VALUES = 50
+
+
+class StatementError(ValueError):
+    """Raised when an uploaded statement cannot be turned into transactions."""
+
+
+# --- Cleaning Rules (shared by the full-frame and streaming paths) ---
+def get_week_of_month(day):
+    """Calculates the approximate week number (1-5)."""
+    return (day - 1) // 7 + 1
+
+def check_columns(df):
+    if not all(col in df.columns for col in REQUIRED_COLUMNS):
+        raise StatementError(f"CSV must have columns: {', '.join(REQUIRED_COLUMNS)}")
+
+def detect_date_format(dates):
+    """Most common strftime format among the leading Date strings, or None if none is recognised."""
+    sample = dates.head(DATE_SAMPLE_ROWS).dropna().astype(str).unique()[:DATE_SAMPLE_VALUES]
+    guesses = Counter(guess_datetime_format(value) for value in sample)
+    guesses.pop(None, None)
+    return guesses.most_common(1)[0][0] if guesses else None
+
+def add_date_features(df, date_format=None):
+    """Parses Date into DateObj, drops undated rows and derives Year/Month/Day/WeekOfMonth.
+
+    Each distinct Date string is parsed once, with an explicit format detected
+    from the leading rows unless date_format is given (False means infer per
+    value), and mapped back to all rows. The date parts come from the
+    distinct dates too. The number of rows coerced to NaT and the format
+    used are recorded in df.attrs.
+    """
+    if date_format is None:
+        date_format = detect_date_format(df['Date'])
+
+    codes, uniques = pd.factorize(df['Date'])
+    if date_format:
+        parsed = pd.DatetimeIndex(pd.to_datetime(uniques, format=date_format, errors='coerce'))
+    else:
+        parsed = pd.DatetimeIndex(pd.to_datetime(uniques, errors='coerce'))
+
+    df['DateObj'] = parsed.take(codes, allow_fill=True, fill_value=pd.NaT)
+    dated = codes >= 0
+    dated[dated] = parsed.notna()[codes[dated]]
+    df.attrs['date_format'] = date_format
+    df.attrs['dates_coerced'] = int((~dated).sum())
+    df.dropna(subset=['DateObj'], inplace=True)
+
+    codes = codes[dated]
+    df['Year'] = parsed.year.to_numpy()[codes].astype(np.int32)
+    df['Month'] = parsed.month.to_numpy()[codes].astype(np.int32)
+    df['Day'] = parsed.day.to_numpy()[codes].astype(np.int32)
+    df['WeekOfMonth'] = get_week_of_month(df['Day'])
+    return df
+
+def clean_statement(df, date_format=None):
+    """Cleans Amount, drops undated rows and adds the date feature columns."""
+    check_columns(df)
+
+    # Robust amount cleaning (similar to index.js logic)
+    df['Amount'] = pd.to_numeric(
+        df['Amount'].astype(str).str.replace(r'[^0-9.-]', '', regex=True),
+        errors='coerce'
+    ).fillna(0)
+
+    df = add_date_features(df, date_format)
+
+    # Ensure Description column for manager.js logic emulation (use Category as fallback)
+    if 'Description' not in df.columns:
+        df['Description'] = df['Category']
+
+    return df
+
+
+# --- Full-Frame Path (small files) ---
+def read_statement(source):
+    """Reads a whole CSV into one cleaned DataFrame sorted by date."""
+    try:
+        df = pd.read_csv(source)
+    except Exception as e:
+        raise StatementError(f"Error reading CSV: {e}") from e
+
+    df = clean_statement(df)
+    if df.empty:
+        raise StatementError("No valid date entries found in the CSV.")
+    return df.sort_values('DateObj')
+
+
+# --- Compact Layout ---
+def bytes_per_row(df):
+    """Deep in-memory size of a statement divided by its row count."""
+    return df.memory_usage(index=True, deep=True).sum() / max(len(df), 1)
+
+def compact_statement(df):
+    """Returns a lower-memory copy of a cleaned statement for session storage.
+
+    Category and Description become categoricals, and Description is dropped
+    when it only repeats Category (readers fall back to Category). Date parts
+    are narrowed to int16/int8, Amount is stored as integer cents in
+    AmountCents, and the raw Date strings are dropped in favour of DateObj.
+    """
+    compact = df.drop(columns=['Date', 'Amount'])
+    if compact['Description'].equals(compact['Category']):
+        compact = compact.drop(columns=['Description'])
+    else:
+        compact['Description'] = compact['Description'].astype('category')
+    compact['Category'] = compact['Category'].astype('category')
+
+    compact['Year'] = compact['Year'].astype(np.int16)
+    for column in ['Month', 'Day', 'WeekOfMonth']:
+        compact[column] = compact[column].astype(np.int8)
+
+    cents = statement_cents(df)
+    fits_int32 = len(cents) == 0 or np.abs(cents).max() <= np.iinfo(np.int32).max
+    compact['AmountCents'] = cents.astype(np.int32 if fits_int32 else np.int64)
+
+    compact.attrs['bytes_per_row_before'] = bytes_per_row(df)
+    return compact
+
+
+def concat_statements(frames):
+    """Concatenates cleaned statements into one frame sorted by date.
+
+    If any part uses the compact layout, all parts are compacted first so
+    the columns line up.
+    """
+    compact = any('AmountCents' in frame.columns for frame in frames)
+    if compact:
+        frames = [frame if 'AmountCents' in frame.columns else compact_statement(frame) for frame in frames]
+        if any('Description' in frame.columns for frame in frames):
+            frames = [frame if 'Description' in frame.columns else frame.assign(Description=frame['Category'])
+                      for frame in frames]
+
+    combined = pd.concat(frames, ignore_index=True).sort_values('DateObj', kind='stable', ignore_index=True)
+    if compact:
+        # Categoricals with different categories concatenate to object; restore them
+        for column in ['Category', 'Description']:
+            if column in combined.columns:
+                combined[column] = combined[column].astype('category')
+    return combined
+
+
+# --- Transaction Identity ---
+def normalize_descriptions(descriptions):
+    """Lower-cased, whitespace-collapsed descriptions, normalizing each distinct value once."""
+    codes, uniques = pd.factorize(pd.Series(descriptions, dtype=object), use_na_sentinel=False)
+    normalized = pd.Index(uniques).astype(str).str.lower().str.split().str.join(' ')
+    return np.asarray(normalized, dtype=object)[codes]
+
+def transaction_hashes(df, account=None):
+    """uint64 hash per row of (date, amount in cents, normalized description, account).
+
+    An Account column overrides account per row.
+    """
+    accounts = df['Account'].astype(str).to_numpy(dtype=object) if 'Account' in df.columns else account or ''
+    keys = pd.DataFrame({
+        'Date': df['DateObj'].to_numpy(),
+        'Cents': statement_cents(df),
+        'Description': normalize_descriptions(statement_descriptions(df)),
+        'Account': accounts,
+    })
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+# --- Multi-File Merge ---
+def merge_statements(frames, account=None):
+    """Merges cleaned statements into one date-sorted frame, dropping transactions repeated across files.
+
+    Each row is keyed by its transaction hash plus its occurrence number
+    among equal hashes in its own file. One duplicated() pass over all keys
+    keeps the first file's copy of an overlapping transaction, and
+    identical transactions within a single file are all kept.
+
+    Returns (merged, dropped), where dropped[i] is the number of rows of
+    frames[i] removed as duplicates.
+    """
+    keys = pd.DataFrame({
+        'File': np.repeat(np.arange(len(frames)), [len(frame) for frame in frames]),
+        'Hash': np.concatenate([transaction_hashes(frame, account) for frame in frames]),
+    })
+    keys['Occurrence'] = keys.groupby(['File', 'Hash'], sort=False).cumcount()
+    duplicate = keys.duplicated(['Hash', 'Occurrence']).to_numpy()
+
+    kept, dropped, start = [], [], 0
+    for frame in frames:
+        mask = duplicate[start:start + len(frame)]
+        kept.append(frame[~mask])
+        dropped.append(int(mask.sum()))
+        start += len(frame)
+
+    merged = concat_statements(kept)
+    merged.attrs['dates_coerced'] = sum(frame.attrs.get('dates_coerced', 0) for frame in frames)
+    return merged, dropped
+
+
+# --- Streaming Path (multi-gigabyte files) ---
+def iter_statement_chunks(source, chunksize=STREAM_CHUNK_ROWS):
+    """Yields cleaned chunks of a CSV without ever holding the whole file as a frame."""
+    try:
+        reader = pd.read_csv(source, chunksize=chunksize)
+        date_format = None
+        for chunk in reader:
+            # Detect the date format on the first chunk only, so every chunk parses alike
+            chunk = clean_statement(chunk, date_format)
+            date_format = chunk.attrs['date_format'] or False
+            yield chunk
+    except StatementError:
+        raise
+    except Exception as e:
+        raise StatementError(f"Error reading CSV: {e}") from e
+
+def stream_statement(source, waste_matcher=None, chunksize=STREAM_CHUNK_ROWS):
+    """Streams a CSV through the cleaning rules into the period/category aggregate.
+
+    Each chunk is waste-labelled with waste_matcher before it is folded in.
+    Peak memory is one chunk plus the aggregate, whatever the file size. The
+    result is identical to aggregate_statement() on the fully loaded frame.
+    """
+    aggregator = StatementAggregator()
+    for chunk in iter_statement_chunks(source, chunksize):
+        if waste_matcher is not None:
+            label_waste(chunk, waste_matcher)
+        aggregator.update(chunk)
+
+    agg = aggregator.result()
+    agg.attrs['dates_coerced'] = aggregator.dates_coerced
+    if agg.empty:
+        raise StatementError("No valid date entries found in the CSV.")
+    return agg
@@ -4,20 +4,12 @@ const totalSpentEl = document.getElementById("totalSpent");
 // REMOVED: suggestedSavingsEl
 const wastedContentEl = document.getElementById("wastedContent");
 
-// NEW: Comprehensive list of categories considered waste
-const HIGH_WASTE_CATEGORIES = [
-    'Luxury Items', 'Jewelry', 'Vacation', 'Pub', 
-    'Liquor Store', 'Dining Out', 'Entertainment',
-    // Including common transactional descriptions as a fallback for waste:
-    'swiggy', 'uber', 'zomato', 'bar', 'delivery', 'coffee', 'cab'
-]; 
-
 const MONTH_NAMES = [
     "January", "February", "March", "April", "May", "June", 
     "July", "August", "September", "October", "November", "December"
 ];
 
-let allBankData = []; // To store all parsed data
+let statementSummary = null; // Years and latest period from the local API
 
 function updateDashboard(totalSpent, year, monthName, scope) {
     totalSpentEl.textContent = `$${totalSpent.toFixed(2)}`;
@@ -32,47 +24,19 @@ function updateDashboard(totalSpent, year, monthName, scope) {
     document.getElementById('summaryTitle').textContent = summaryText;
 }
 
-// Function to analyze wasteful spending (Groups by Category, as requested)
-function analyzeWastedSpending(data) {
-    if (!data || data.length === 0) {
+// Renders the period's waste summary: [category, amount] pairs from the API, largest first
+// (rows are labelled with the same waste keywords the Streamlit app uses)
+function analyzeWastedSpending(sortedWaste) {
+    if (!sortedWaste) {
         wastedContentEl.innerHTML = "<p>No expenses found this period to analyze.</p>";
         return;
     }
 
-    // Filter for expenses that match the high-waste categories or contain keywords in Description
-    const wasteData = data.filter(d => 
-        d.Amount > 0 && 
-        d.Category && // Must have a category
-        d.Category !== 'Income' && 
-        d.Category !== 'Savings' && 
-        d.Category !== 'Transfer' 
-    ).filter(d => {
-        const categoryMatch = HIGH_WASTE_CATEGORIES.includes(d.Category);
-        const descriptionText = (d.Description || '').toLowerCase();
-        
-        // Check if description contains any of the transactional waste keywords
-        const descriptionMatch = HIGH_WASTE_CATEGORIES.some(keyword => 
-            descriptionText.includes(keyword.toLowerCase())
-        );
-
-        return categoryMatch || descriptionMatch;
-    });
-
-    if (wasteData.length === 0) {
+    if (sortedWaste.length === 0) {
         wastedContentEl.innerHTML = "<p>Great job! We didn't find any high-waste activities in your spending for this period.</p>";
         return;
     }
 
-    // Group by Category and sum the amount
-    const wasteSummary = wasteData.reduce((acc, item) => {
-        // Use the Category name for grouping
-        const categoryName = item.Category || 'Uncategorized Waste'; 
-        acc[categoryName] = (acc[categoryName] || 0) + item.Amount;
-        return acc;
-    }, {});
-
-    const sortedWaste = Object.entries(wasteSummary).sort(([, a], [, b]) => b - a);
-
     const totalWaste = sortedWaste.reduce((sum, [, amount]) => sum + amount, 0);
 
     let html = `<p>You spent a total of <strong>$${totalWaste.toFixed(2)}</strong> on the following high-waste activities this period:</p>`;
@@ -119,7 +83,7 @@ function initializePeriodSelectors() {
     yearSelect.innerHTML = '';
     
     // Populate Years
-    const uniqueYears = [...new Set(allBankData.map(d => d.Year))].sort((a, b) => b - a);
+    const uniqueYears = statementSummary.years;
     uniqueYears.forEach(year => {
         const option = document.createElement('option');
         option.value = year;
@@ -132,16 +96,13 @@ function initializePeriodSelectors() {
 
     // Set default period to the latest month
     if (uniqueYears.length > 0) {
-        const latestYear = uniqueYears[0];
-        const latestMonth = Math.max(...allBankData.filter(d => d.Year === latestYear).map(d => d.Month));
-        
-        yearSelect.value = latestYear;
-        monthSelect.value = MONTH_NAMES[latestMonth - 1]; 
+        yearSelect.value = statementSummary.latest.year;
+        monthSelect.value = MONTH_NAMES[statementSummary.latest.month - 1];
     }
 }
 
-// Filter data and calculate total spent for the selected period
-function filterAndRender() {
+// Fetch the total spent and waste summary of the selected period
+async function filterAndRender() {
     const scope = document.getElementById("scopeSelect").value;
     const yearSelect = document.getElementById("yearSelect");
     const monthSelect = document.getElementById("monthSelect");
@@ -153,8 +114,7 @@ function filterAndRender() {
     }
     
     const year = parseInt(yearSelect.value);
-    
-    let currentFilteredData = allBankData.filter(d => d.Year === year);
+    const period = { scope, year };
     let monthName = '';
 
     if (scope === 'monthly') {
@@ -164,35 +124,28 @@ function filterAndRender() {
             analyzeWastedSpending(null);
             return;
         }
-        const month = MONTH_NAMES.indexOf(monthName) + 1; // 1-12
-        currentFilteredData = currentFilteredData.filter(d => d.Month === month);
+        period.month = MONTH_NAMES.indexOf(monthName) + 1; // 1-12
     }
     
-    // Calculate total spending (excluding Income and Savings from 'spent')
-    const totalSpent = currentFilteredData
-        .filter(d => d.Amount > 0 && d.Category !== 'Income' && d.Category !== 'Savings' && d.Category !== 'Transfer')
-        .reduce((sum, d) => sum + d.Amount, 0);
-
-    updateDashboard(totalSpent, year, monthName, scope);
-    analyzeWastedSpending(currentFilteredData); 
+    try {
+        // Total spending already excludes Income, Savings and Transfer
+        const aggregates = await apiGet('period', period);
+        updateDashboard(aggregates.total, year, monthName, scope);
+        analyzeWastedSpending(aggregates.rows > 0 ? aggregates.waste : null);
+    } catch (error) {
+        console.error("Error loading the period from the local API:", error);
+        updateDashboard(0, 'Error', 'Loading', scope);
+        analyzeWastedSpending(null);
+    }
 }
 
 
-document.addEventListener("DOMContentLoaded", () => {
-    const savedData = localStorage.getItem("bankData");
-    
-    if (savedData) {
+document.addEventListener("DOMContentLoaded", async () => {
+    if (getStatementId()) {
         try {
-            allBankData = JSON.parse(savedData).map(row => {
-                const dateObj = new Date(row.Date);
-                row.Year = dateObj.getFullYear();
-                row.Month = dateObj.getMonth() + 1;
-                // Ensure there is a 'Description' for waste analysis (use Category if missing)
-                row.Description = row.Description || row.Category || ''; 
-                return row;
-            });
-
-            if (allBankData.length > 0) {
+            statementSummary = await apiGet('summary');
+
+            if (statementSummary.years.length > 0) {
                 initializePeriodSelectors();
                 
                 // Set initial scope visibility and render
@@ -209,12 +162,12 @@ document.addEventListener("DOMContentLoaded", () => {
                 analyzeWastedSpending(null);
             }
         } catch (error) {
-            console.error("Error loading or parsing data:", error);
+            console.error("Error loading the statement from the local API:", error);
             updateDashboard(0, 'Error', 'Loading', 'monthly');
             analyzeWastedSpending(null);
         }
     } else {
-        // No data in localStorage
+        // No statement uploaded yet
         updateDashboard(0, 'N/A', 'N/A', 'monthly');
         analyzeWastedSpending(null);
     }
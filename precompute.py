@@ -0,0 +1,98 @@
+"""Background precomputation of the page aggregates after an upload.
+
+A PagePrecomputer walks every period of a cube on a daemon thread and
+keeps what the pages ask for: the Manage totals and waste summaries, the
+Analyze category splits and trends, and the Predict forecast table. Pages
+look results up with the arguments they would pass to the cube and
+compute inline on a miss, so they never block on the worker. Cancelling
+sets an event that the worker checks between periods.
+"""
+import threading
+
+import pandas as pd
+
+# Aggregates computed per period, by the scopes the pages offer them in
+PERIOD_AGGREGATES = {
+    'total': lambda cube, *period: cube.total(*period),
+    'waste': lambda cube, *period: cube.category_totals(*period, waste_only=True),
+    'categories': lambda cube, *period: cube.category_totals(*period),
+    'trend': lambda cube, *period: cube.trend(*period),
+}
+SCOPE_AGGREGATES = {
+    'yearly': ['total', 'waste', 'categories', 'trend'],
+    'monthly': ['total', 'waste', 'categories', 'trend'],
+    'weekly': ['categories', 'trend'],
+}
+
+
+def period_aggregate(cube, kind, scope, year, month, week):
+    return PERIOD_AGGREGATES[kind](cube, scope, year, month, week)
+
+def cube_periods(cube):
+    """(scope, year, month, week) of every year, month and week of the cube, newest first."""
+    for year in cube.years:
+        yield 'yearly', year, None, None
+        for month in range(12, 0, -1):
+            yield 'monthly', year, month, None
+            for week in range(int(cube.max_week(year, month)), 0, -1):
+                yield 'weekly', year, month, week
+
+
+class PagePrecomputer:
+    """Computes a cube's page aggregates on a background thread.
+
+    forecasts maps a model key to a callable returning its forecast table;
+    those run first, as they are the slowest page stage. The callables run
+    off the script thread, so they must not touch st.session_state.
+    """
+
+    def __init__(self, cube, forecasts=None):
+        self.cube = cube
+        self.error = None
+        self._forecasts = dict(forecasts or {})
+        self._results = {}
+        self._steps = None
+        self._done = 0
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='spendwise-precompute', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    @property
+    def progress(self):
+        """Fraction of the work finished (0 until the periods are enumerated)."""
+        if not self._steps:
+            return 1.0 if self._steps == 0 else 0.0
+        return self._done / self._steps
+
+    def get(self, kind, *args):
+        """A finished result, or None. Frames are copied since pages add display columns."""
+        value = self._results.get((kind, *args))
+        return value.copy() if isinstance(value, pd.DataFrame) else value
+
+    def _run(self):
+        try:
+            periods = list(cube_periods(self.cube))
+            self._steps = len(self._forecasts) + len(periods)
+            for key, compute in self._forecasts.items():
+                if self._cancelled.is_set():
+                    return
+                self._results[('forecast', *key)] = compute()
+                self._done += 1
+            for period in periods:
+                if self._cancelled.is_set():
+                    return
+                for kind in SCOPE_AGGREGATES[period[0]]:
+                    self._results[(kind, *period)] = period_aggregate(self.cube, kind, *period)
+                self._done += 1
+        except Exception as e:  # Pages compute whatever is missing themselves
+            self.error = e
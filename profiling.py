@@ -0,0 +1,117 @@
+"""Per-stage timings of each page rerun, for the in-app performance panel.
+
+A disabled profiler hands out one shared no-op stage, so instrumented code
+costs a method call per stage. When enabled, every stage records its wall
+time, an optional row count and the change in process memory.
+"""
+import json
+import os
+import time
+from collections import deque
+
+try:
+    import psutil
+except ImportError:  # Optional: fall back to /proc on Linux, or skip memory deltas
+    psutil = None
+
+# Reruns kept for the sidebar panel
+PROFILE_HISTORY = 20
+
+
+def current_rss():
+    """Resident memory of this process in bytes, or None where it cannot be read."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class _NullStage:
+    """Stand-in for a stage while profiling is off."""
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass  # Instrumented code may set rows; there is nothing to keep
+
+_NULL_STAGE = _NullStage()
+
+class _Stage:
+    """Times one named stage and appends its record to the current run."""
+
+    def __init__(self, records, name, rows):
+        self._records = records
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self._rss = current_rss()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self._started
+        rss = current_rss()
+        delta = None if rss is None or self._rss is None else (rss - self._rss) / 1024 ** 2
+        self._records.append({'stage': self.name, 'seconds': seconds,
+                              'rows': None if self.rows is None else int(self.rows),
+                              'memory_delta_mb': delta})
+        return False
+
+
+class StageProfiler:
+    """Collects named stage timings per rerun and keeps the last few runs.
+
+    Usage:
+        profiler.start_run('analyze')
+        with profiler.stage('category_totals') as stage:
+            summary = cube.category_totals(...)
+            stage.rows = len(summary)
+        profiler.end_run()
+
+    Finished runs are kept in runs (newest last) and, if export_path is set,
+    appended to it as JSON lines, one line per stage.
+    """
+
+    def __init__(self, history=PROFILE_HISTORY, export_path=None):
+        self.enabled = False
+        self.export_path = export_path
+        self.runs = deque(maxlen=history)
+        self._run = None
+
+    def start_run(self, page):
+        self._run = {'page': page, 'started': time.time(), 'stages': []} if self.enabled else None
+        if self._run is not None:
+            self._run_started = time.perf_counter()
+
+    def stage(self, name, rows=None):
+        if self._run is None:
+            return _NULL_STAGE
+        return _Stage(self._run['stages'], name, rows)
+
+    def end_run(self):
+        run, self._run = self._run, None
+        if run is None:
+            return None
+        run['seconds'] = time.perf_counter() - self._run_started
+        self.runs.append(run)
+        if self.export_path:
+            with open(self.export_path, 'a', encoding='utf-8') as out:
+                out.write(self.to_jsonl([run]))
+        return run
+
+    def to_jsonl(self, runs=None):
+        """Stage records of the given runs (default: all kept runs) as JSON lines."""
+        lines = []
+        for run in self.runs if runs is None else runs:
+            for record in run['stages']:
+                lines.append(json.dumps({'run_started': run['started'], 'page': run['page'], **record}))
+        return ''.join(line + '\n' for line in lines)
@@ -0,0 +1,126 @@
+"""HTML fragments and the Detailed Statement window, built column-wise.
+
+Every fragment is assembled from whole columns in one pass (number
+formatting with np.char.mod, string concatenation on Series) instead of
+per-row f-strings inside iterrows() loops. Category names are
+HTML-escaped because the fragments are rendered with unsafe_allow_html.
+"""
+import html
+
+import numpy as np
+import pandas as pd
+
+from aggregates import statement_amounts, statement_descriptions
+
+# Category names highlighted in the Analyze split (analysis.js colour logic)
+HIGHLIGHT_PATTERN = 'Food|Delivery|Cab|Bar'
+
+STATEMENT_SORT_COLUMNS = ['Date', 'Category', 'Amount ($)']
+STATEMENT_PAGE_SIZES = [50, 100, 250, 500]
+
+# Unusual charges listed on the Manage page, highest score first
+ANOMALY_LIST_LIMIT = 20
+
+
+def format_number(values, spec='%.2f'):
+    """Formats a numeric column into a Series of strings in one vectorized call."""
+    return pd.Series(np.char.mod(spec, np.asarray(values, dtype=np.float64)), dtype=object)
+
+def escaped_column(values):
+    """HTML-escapes a text column, escaping each distinct value once."""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+    escaped = np.array([html.escape(str(value)) for value in uniques], dtype=object)
+    return pd.Series(escaped[codes], dtype=object)
+
+
+# --- HTML Fragments ---
+def waste_list_html(waste_summary):
+    """Waste list of the Manage page: one item with a bar per category."""
+    amounts = waste_summary['Amount'].to_numpy(dtype=np.float64)
+    percent = format_number(amounts / amounts.sum() * 100, '%.1f')
+    items = ('<li class="waste-item"><strong class="waste-amount">$' + format_number(amounts)
+             + '</strong> wasted on <strong>' + escaped_column(waste_summary['Category'])
+             + '</strong> (' + percent + '%)<div class="waste-bar"><div class="waste-fill" style="width: '
+             + percent + '%;"></div></div></li>')
+    return '<ul class="waste-list">' + ''.join(items) + '</ul>'
+
+def anomaly_list_html(anomalies, limit=ANOMALY_LIST_LIMIT):
+    """Unusual charges of the Manage page, the highest anomaly scores first."""
+    top = anomalies.iloc[np.argsort(-anomalies['AnomalyScore'].to_numpy(), kind='stable')[:limit]]
+    dates = pd.Series(top['DateObj'].dt.strftime('%Y-%m-%d').to_numpy(), dtype=object)
+    items = ('<li class="waste-item">⚠️ <strong class="waste-amount">$' + format_number(statement_amounts(top))
+             + '</strong> on <strong>' + escaped_column(top['Category']) + '</strong>: '
+             + escaped_column(statement_descriptions(top)) + ', ' + dates
+             + ' (' + format_number(top['AnomalyScore'], '%.1f') + '&sigma; above usual)</li>')
+    return '<ul class="waste-list">' + ''.join(items) + '</ul>'
+
+def category_bars_html(category_summary):
+    """Category split of the Analyze page: one labelled bar per category."""
+    categories = category_summary['Category'].astype(str)
+    amounts = category_summary['Amount'].to_numpy(dtype=np.float64)
+    percent = format_number(amounts / amounts.sum() * 100, '%.1f')
+    colors = pd.Series(np.where(categories.str.contains(HIGHLIGHT_PATTERN, regex=True), '#ff7f0e', '#d9534f'),
+                       dtype=object)
+    items = ('<li style="margin-bottom: 5px;"><strong>' + escaped_column(categories) + ':</strong> $'
+             + format_number(amounts) + ' (' + percent + '%)'
+             + '<div style="height: 10px; background-color: #eee; border-radius: 5px; margin-top: 3px;">'
+             + '<div class="category-bar-fill" style="width: ' + percent + '%; background-color: ' + colors
+             + ';"></div></div></li>')
+    return '<ul style="list-style-type: none; padding: 0; text-align: left;">' + ''.join(items) + '</ul>'
+
+def forecast_table_html(results_df):
+    """Forecast table of the Predict page, with the TOTAL FORECAST row."""
+    rows = ('<tr><td class="category-name">' + escaped_column(results_df['Category'])
+            + '</td><td>$' + format_number(results_df['Next Month Forecast'])
+            + '</td><td>$' + format_number(results_df['Next Year Total Forecast'])
+            + '</td><td>' + format_number(results_df['MSE Loss']) + '</td></tr>')
+    total_next_month = results_df['Next Month Forecast'].sum()
+    total_next_year = results_df['Next Year Total Forecast'].sum()
+    return ('<table class="prediction-table"><thead><tr><th>Category</th><th>Next Month Forecast</th>'
+            '<th>Next Year Total Forecast</th><th>MSE Loss</th></tr></thead><tbody>'
+            + ''.join(rows)
+            + '<tr class="total-row"><td class="category-name"><strong>TOTAL FORECAST</strong></td>'
+            f'<td><strong>${total_next_month:.2f}</strong></td><td><strong>${total_next_year:.2f}</strong></td>'
+            '<td>N/A</td></tr></tbody></table>')
+
+
+# --- Detailed Statement Window ---
+def statement_window(statement_df, search='', sort_by='Date', descending=False, page=1, page_size=100):
+    """One display page of the Detailed Statement, plus the number of matching rows.
+
+    Search (case-insensitive, on Category and Description) and sorting run
+    on the raw columns; only the rows of the requested page are copied and
+    formatted for display.
+    """
+    matches = np.ones(len(statement_df), dtype=bool)
+    if search:
+        needle = search.lower()
+        matches[:] = False
+        for column in [statement_df['Category'], statement_descriptions(statement_df)]:
+            # Test each distinct value once and map the result back to the rows
+            codes, uniques = pd.factorize(column, use_na_sentinel=False)
+            hits = pd.Index(uniques).astype(str).str.lower().str.contains(needle, regex=False)
+            matches |= np.asarray(hits, dtype=bool)[codes]
+    positions = np.flatnonzero(matches)
+
+    # The statement is already in date order, so only other columns need a sort
+    if sort_by == 'Category':
+        positions = positions[np.argsort(statement_df['Category'].astype(str).to_numpy()[positions], kind='stable')]
+    elif sort_by == 'Amount ($)':
+        positions = positions[np.argsort(statement_amounts(statement_df).to_numpy()[positions], kind='stable')]
+    if descending:
+        positions = positions[::-1]
+
+    total = len(positions)
+    start = (max(page, 1) - 1) * page_size
+    window = statement_df.iloc[positions[start:start + page_size]]
+
+    display_df = pd.DataFrame({
+        'Date': window['DateObj'].to_numpy(),
+        'Category': window['Category'].to_numpy(),
+        'Amount ($)': ('$' + format_number(statement_amounts(window))).to_numpy(),
+    })
+    if 'Anomaly' in window.columns:
+        scores = ('⚠️ ' + format_number(window['AnomalyScore'], '%.1f') + 'σ above usual').to_numpy()
+        display_df['Unusual'] = np.where(window['Anomaly'].to_numpy(dtype=bool), scores, '')
+    return display_df, total
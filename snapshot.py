@@ -0,0 +1,71 @@
+"""Memory-mapped Arrow snapshots of parsed statements.
+
+The parse_csv output is written once as an uncompressed Arrow IPC file
+named after the source file's digest and the parser version. Loading it
+memory-maps the file, and numeric, date and null-free text columns stay
+backed by the mapping. Every session and process that opens the same
+snapshot therefore shares one set of read-only pages, and reopening skips
+CSV parsing entirely. Needs pyarrow; without it snapshots are disabled.
+"""
+import json
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # Optional dependency: callers fall back to parsing every time
+    pa = None
+
+# Schema metadata key holding the frame's attrs (date format, coerced row count, ...)
+ATTRS_METADATA_KEY = b'spendwise.attrs'
+
+
+def snapshots_available():
+    return pa is not None
+
+def snapshot_path(directory, digest, parser_version):
+    """Snapshot file for a source digest. Another parser version never matches an old file."""
+    return os.path.join(directory, f'statement-{digest}-v{parser_version}.arrow')
+
+def write_snapshot(df, path):
+    """Writes df as an Arrow IPC file, atomically so readers never see a partial snapshot."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[ATTRS_METADATA_KEY] = json.dumps(df.attrs, default=str).encode('utf-8')
+    table = table.replace_schema_metadata(metadata)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temporary = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        with pa.OSFile(temporary, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+def read_snapshot(path):
+    """Opens a snapshot as a DataFrame whose columns point into the memory-mapped file.
+
+    Text columns become pyarrow-backed strings, which avoids copying them
+    into Python objects. Text columns with missing values are the exception:
+    they are converted to object dtype so that missing entries stay NaN, as
+    they are in parse_csv output.
+    """
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    df = table.to_pandas(split_blocks=True, types_mapper={
+        pa.string(): pd.StringDtype('pyarrow'),
+        pa.large_string(): pd.StringDtype('pyarrow'),
+    }.get)
+    for name, column in zip(table.column_names, table.columns):
+        if pa.types.is_string(column.type) and column.null_count:
+            df[name] = df[name].astype(object).where(df[name].notna(), np.nan)
+
+    attrs = (table.schema.metadata or {}).get(ATTRS_METADATA_KEY)
+    if attrs:
+        df.attrs.update(json.loads(attrs))
+    return df
@@ -0,0 +1,248 @@
+"""Optional SQLite transaction store that keeps statements between sessions.
+
+Uploads are bulk-inserted once (keyed by content digest) into an indexed
+transactions table, and transactions already stored from an overlapping
+upload are skipped by their transaction hash. StoreCube answers the same
+period queries as PeriodCube with SQL range scans on the date key, so page latency depends
+on the selected period, not on how much history the store holds.
+"""
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from aggregates import EXCLUDED_CATEGORIES, statement_cents, statement_descriptions
+from cube import date_key, period_key_range
+from ingest import transaction_hashes
+
+# Account recorded for uploads without an Account column
+DEFAULT_ACCOUNT = 'default'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    account TEXT NOT NULL,
+    date_key INTEGER NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    week INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    category TEXT,
+    description TEXT,
+    cents INTEGER NOT NULL,
+    waste INTEGER NOT NULL DEFAULT 0,
+    hash INTEGER NOT NULL,
+    occurrence INTEGER NOT NULL
+);
+-- Covers the period totals, category splits and trends, so they never touch the table itself
+CREATE INDEX IF NOT EXISTS transactions_date ON transactions (date_key, category, cents, waste);
+CREATE INDEX IF NOT EXISTS transactions_category ON transactions (category, date_key);
+CREATE INDEX IF NOT EXISTS transactions_account ON transactions (account, date_key);
+-- A transaction is stored once per (hash, occurrence): identical transactions within one upload
+-- get occurrences 0, 1, ... and are all kept
+CREATE UNIQUE INDEX IF NOT EXISTS transactions_hash ON transactions (hash, occurrence);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS imports (
+    digest TEXT PRIMARY KEY,
+    account TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    imported_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Expense rows as PeriodCube counts them: positive amounts outside the excluded categories
+_EXCLUDED = ', '.join('?' * len(EXCLUDED_CATEGORIES))
+EXPENSE_FILTER = f"cents > 0 AND (category IS NULL OR category NOT IN ({_EXCLUDED}))"
+
+
+def hash_occurrences(df, account=None):
+    """Signed 64-bit transaction hashes (SQLite integers) and each row's occurrence among equal hashes."""
+    hashes = transaction_hashes(df, account).view(np.int64)
+    return hashes, pd.Series(hashes).groupby(hashes).cumcount().to_numpy()
+
+
+class TransactionStore:
+    """One SQLite file shared by every session of the process."""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            # WAL with NORMAL sync keeps bulk inserts fast and still survives crashes
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    def query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @property
+    def waste_signature(self):
+        """Signature of the waste keywords the stored labels were computed with."""
+        rows = self.query("SELECT value FROM meta WHERE key = 'waste_signature'")
+        return rows[0][0] if rows else None
+
+    def has_transactions(self):
+        return bool(self.query("SELECT 1 FROM transactions LIMIT 1"))
+
+    def has_import(self, digest):
+        return bool(self.query("SELECT 1 FROM imports WHERE digest = ?", (digest,)))
+
+    def insert_statement(self, df, digest, account=DEFAULT_ACCOUNT):
+        """Bulk-inserts a cleaned, waste-labelled statement once per file digest.
+
+        Transactions already stored from an earlier, overlapping upload are
+        skipped. An Account column in the statement overrides account per
+        row. Returns the number of rows inserted (0 when the file was
+        already imported).
+        """
+        if self.has_import(digest):
+            return 0
+        accounts = df['Account'].astype(str) if 'Account' in df.columns else pd.Series(account, index=df.index)
+        categories = df['Category'].astype(object).where(df['Category'].notna(), None)
+        descriptions = statement_descriptions(df).astype(object)
+        descriptions = descriptions.where(descriptions.notna(), None)
+        waste = df['Waste'].to_numpy(dtype=bool) if 'Waste' in df.columns else np.zeros(len(df), dtype=bool)
+        hashes, occurrences = hash_occurrences(df, account)
+        rows = zip(
+            accounts.tolist(),
+            date_key(df['Year'], df['Month'], df['Day']).tolist(),
+            df['Year'].astype(int).tolist(), df['Month'].astype(int).tolist(),
+            df['WeekOfMonth'].astype(int).tolist(), df['Day'].astype(int).tolist(),
+            categories.tolist(), descriptions.tolist(),
+            statement_cents(df).tolist(), waste.astype(int).tolist(),
+            hashes.tolist(), occurrences.tolist(),
+        )
+        with self._lock, self._conn:
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO transactions (account, date_key, year, month, week, day, category, "
+                "description, cents, waste, hash, occurrence) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows).rowcount
+            self._conn.execute("INSERT INTO imports (digest, account, rows) VALUES (?, ?, ?)",
+                               (digest, account, inserted))
+            self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('waste_signature', ?)",
+                               (df.attrs.get('waste_signature'),))
+        return inserted
+
+    def relabel_waste(self, matcher):
+        """Re-applies the waste keywords to every stored row, one classification per distinct text."""
+        pairs = pd.DataFrame(self.query("SELECT DISTINCT category, description FROM transactions"),
+                             columns=['Category', 'Description'])
+        if pairs.empty:
+            return
+        wasted = pairs[matcher.classify(pairs).to_numpy(dtype=bool)]
+        with self._lock, self._conn:
+            # One pass over the table, looking each row up in an indexed temp table of the wasted pairs
+            self._conn.execute("CREATE TEMP TABLE wasted_pairs (category TEXT, description TEXT)")
+            self._conn.execute("CREATE INDEX temp.wasted_pairs_key ON wasted_pairs (category, description)")
+            self._conn.executemany("INSERT INTO wasted_pairs VALUES (?, ?)",
+                                   wasted[['Category', 'Description']].itertuples(index=False, name=None))
+            self._conn.execute(
+                "UPDATE transactions SET waste = EXISTS (SELECT 1 FROM wasted_pairs w "
+                "WHERE w.category IS transactions.category AND w.description IS transactions.description)")
+            self._conn.execute("DROP TABLE temp.wasted_pairs")
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('waste_signature', ?)",
+                               (matcher.signature,))
+
+    def accounts(self):
+        return [account for (account,) in self.query("SELECT DISTINCT account FROM transactions ORDER BY account")]
+
+
+class StoreCube:
+    """PeriodCube interface over a TransactionStore, optionally limited to one account."""
+
+    def __init__(self, store, account=None):
+        self._store = store
+        self.account = account
+        # Probe each year between the first and last date through the date index, instead of a DISTINCT scan
+        # (separate MIN and MAX queries, so each is a single index lookup)
+        (first,), = self._query("SELECT MIN(date_key)", "1", ())
+        (last,), = self._query("SELECT MAX(date_key)", "1", ())
+        self.years = [] if first is None else [
+            year for year in range(last // 10000, first // 10000 - 1, -1)
+            if self._query("SELECT 1", "date_key BETWEEN ? AND ?", period_key_range('yearly', year, None, None),
+                           "LIMIT 1")
+        ]
+        self.latest = None if last is None else (last // 10000, last // 100 % 100, last % 100)
+
+    def _query(self, select, where, params, tail=''):
+        if self.account is not None:
+            where, params = f"account = ? AND {where}", (self.account, *params)
+        return self._store.query(f"{select} FROM transactions WHERE {where} {tail}", params)
+
+    def _expense_query(self, select, scope, year, month, week, extra='', tail=''):
+        first, last = period_key_range(scope, year, month, week)
+        return self._query(select, f"date_key BETWEEN ? AND ? AND {EXPENSE_FILTER}{extra}",
+                           (first, last, *EXCLUDED_CATEGORIES), tail)
+
+    def max_week(self, year, month):
+        """Last week number with any transaction in the month (5 when unknown)."""
+        (week,), = self._query("SELECT MAX(week)", "date_key BETWEEN ? AND ?",
+                               period_key_range('monthly', year, month, None))
+        return week or 5
+
+    def total(self, scope, year, month, week):
+        (cents,), = self._expense_query("SELECT COALESCE(SUM(cents), 0)", scope, year, month, week)
+        return cents / 100
+
+    def category_totals(self, scope, year, month, week, waste_only=False):
+        """Category/Amount frame for the period, largest first."""
+        rows = self._expense_query("SELECT category, SUM(cents) AS total", scope, year, month, week,
+                                   " AND category IS NOT NULL" + (" AND waste = 1" if waste_only else ""),
+                                   "GROUP BY category ORDER BY total DESC, category")
+        frame = pd.DataFrame(rows, columns=['Category', 'Amount'])
+        frame['Amount'] = frame['Amount'].astype(np.float64) / 100
+        return frame
+
+    def trend(self, scope, year, month, week):
+        """Spending per Month (yearly), WeekOfMonth (monthly) or DateKey (weekly) in the period."""
+        column, field = {
+            'yearly': ('Month', 'month'),
+            'monthly': ('WeekOfMonth', 'week'),
+        }.get(scope, ('DateKey', 'date_key'))
+        rows = self._expense_query(f"SELECT {field}, SUM(cents)", scope, year, month, week,
+                                   tail=f"GROUP BY {field} ORDER BY {field}")
+        frame = pd.DataFrame(rows, columns=[column, 'Amount'])
+        frame['Amount'] = frame['Amount'].astype(np.float64) / 100
+        return frame
+
+    @property
+    def has_rows(self):
+        return True
+
+    def rows(self, scope, year, month, week):
+        """Row-level expense transactions of the period, in date order."""
+        rows = self._expense_query("SELECT date_key, year, month, day, week, category, description, cents, waste",
+                                   scope, year, month, week, tail="ORDER BY date_key, id")
+        frame = pd.DataFrame(rows, columns=['DateKey', 'Year', 'Month', 'Day', 'WeekOfMonth', 'Category',
+                                            'Description', 'Cents', 'Waste'])
+        frame.insert(0, 'DateObj', pd.to_datetime(frame.pop('DateKey').astype(str), format='%Y%m%d'))
+        frame['Amount'] = frame.pop('Cents') / 100
+        frame['Waste'] = frame['Waste'].astype(bool)
+        return frame
+
+    def monthly_category_totals(self):
+        """Expense Amount per (Year, Month, Category), as forecasting.monthly_category_totals() computes it."""
+        rows = self._query("SELECT year, month, category, SUM(cents)",
+                           f"category IS NOT NULL AND category NOT IN ({_EXCLUDED})", tuple(EXCLUDED_CATEGORIES),
+                           "GROUP BY year, month, category ORDER BY year, month, category")
+        frame = pd.DataFrame(rows, columns=['Year', 'Month', 'Category', 'Cents'])
+        frame['Amount'] = frame.pop('Cents').astype(np.float64) / 100
+        return frame
+
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+def open_store(path):
+    """The process-wide TransactionStore for path, opened on first use."""
+    with _STORES_LOCK:
+        if path not in _STORES:
+            _STORES[path] = TransactionStore(path)
+        return _STORES[path]
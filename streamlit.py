@@ -1,7 +1,26 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
+import os
 import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from aggregates import aggregate_statement, combine_aggregates
+from anomaly import AnomalyDetector, label_anomalies
+from backtest import backtest_categories
+from caching import FORECAST_CACHE, PARSE_CACHE, content_digest
+from cube import PeriodCube
+from forecasting import (FORECASTERS, ForecastState, build_category_monthly, cached_forecast, make_forecaster,
+                         monthly_category_totals, number_category_months)
+from ingest import (StatementError, bytes_per_row, compact_statement, get_week_of_month, merge_statements,
+                    read_statement, stream_statement)
+from precompute import PagePrecomputer, period_aggregate
+from profiling import StageProfiler
+from rendering import (STATEMENT_PAGE_SIZES, STATEMENT_SORT_COLUMNS, anomaly_list_html, category_bars_html,
+                       forecast_table_html, statement_window, waste_list_html)
+from snapshot import read_snapshot, snapshot_path, snapshots_available, write_snapshot
+from store import DEFAULT_ACCOUNT, StoreCube, open_store
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from waste import DEFAULT_WASTE_KEYWORDS, WasteMatcher, label_waste
 
 # --- FIX START ---
 # CORRECTED: Use pd.errors.SettingWithCopyWarning for modern Pandas versions
@@ -9,15 +28,37 @@ warnings.filterwarnings('ignore', category=pd.errors.SettingWithCopyWarning)
 # --- FIX END ---
 
 # --- Constants ---
+# Bump whenever parse_csv output changes so cached parses are not reused
+PARSER_VERSION = 5
+
+# Uploads larger than this are streamed in chunks instead of loaded whole. It must stay
+# below Streamlit's server.maxUploadSize (200 MB by default), or no upload ever streams;
+# set SPENDWISE_STREAMING_THRESHOLD_MB to tune it alongside that limit
+STREAMING_THRESHOLD_BYTES = int(float(os.environ.get('SPENDWISE_STREAMING_THRESHOLD_MB', 50)) * 1024 ** 2)
+
+# Threads parsing the files of a multi-file upload (the CSV tokenizer releases the GIL)
+UPLOAD_WORKERS = min(8, os.cpu_count() or 1)
+
+# Set SPENDWISE_PROFILE=1 to start sessions with stage profiling on, and
+# SPENDWISE_PROFILE_LOG to a path to append every profiled rerun as JSON lines
+PROFILE_ENABLED_DEFAULT = os.environ.get('SPENDWISE_PROFILE', '') not in ('', '0')
+PROFILE_LOG_PATH = os.environ.get('SPENDWISE_PROFILE_LOG')
+
+# Set SPENDWISE_SNAPSHOT_DIR to keep memory-mapped snapshots of parsed statements there,
+# shared read-only by every session and reused across restarts (needs pyarrow)
+SNAPSHOT_DIR = os.environ.get('SPENDWISE_SNAPSHOT_DIR')
+
+# Set SPENDWISE_FORECAST_CACHE_DIR to spill forecast tables evicted from the
+# process-wide forecast cache there, so they are reused after eviction and restarts
+FORECAST_CACHE.directory = os.environ.get('SPENDWISE_FORECAST_CACHE_DIR')
+
+# Set SPENDWISE_STORE to a SQLite file path to keep uploaded statements between sessions
+STORE_PATH = os.environ.get('SPENDWISE_STORE')
+
 ST_MONTH_NAMES = ["January", "February", "March", "April", "May", "June",
                   "July", "August", "September", "October", "November", "December"]
 
-# Merged waste list from manager.js and streamlit.py
-ST_WASTE_CATEGORIES = [
-    'Luxury Items', 'Jewelry', 'Vacation', 'Pub', 'Liquor Store', 
-    'Dining Out', 'Entertainment', 'swiggy', 'uber', 'zomato', 
-    'bar', 'delivery', 'coffee', 'cab'
-]
+ST_WASTE_CATEGORIES = DEFAULT_WASTE_KEYWORDS
 
 # --- Styles ---
 def apply_styles():
@@ -99,106 +140,454 @@ def apply_styles():
     """, unsafe_allow_html=True)
 
 # --- Data Handling ---
-def get_week_of_month(day):
-    """Calculates the approximate week number (1-5)."""
-    return (day - 1) // 7 + 1
-
 def parse_csv(uploaded_file):
     """Reads CSV, cleans Amount, and calculates date features."""
     try:
-        df = pd.read_csv(uploaded_file)
-    except Exception as e:
-        st.error(f"Error reading CSV: {e}")
+        return read_statement(uploaded_file)
+    except StatementError as e:
+        st.error(str(e))
         return None
-        
-    required_cols = ['Date', 'Category', 'Amount']
-    # Check for core columns
-    if not all(col in df.columns for col in required_cols):
-        st.error(f"CSV must have columns: {', '.join(required_cols)}")
+
+def stream_csv(uploaded_file, waste_matcher):
+    """Streams a large CSV in chunks straight into the period/category aggregate."""
+    try:
+        return stream_statement(uploaded_file, waste_matcher)
+    except StatementError as e:
+        st.error(str(e))
         return None
-    
-    # Robust amount cleaning (similar to index.js logic)
-    df['Amount'] = pd.to_numeric(
-        df['Amount'].astype(str).str.replace(r'[^0-9.-]', '', regex=True), 
-        errors='coerce'
-    ).fillna(0)
-    
-    # Date parsing
-    df['DateObj'] = pd.to_datetime(df['Date'], errors='coerce')
-    df.dropna(subset=['DateObj'], inplace=True)
 
+def parse_csv_snapshot(uploaded_file, digest):
+    """parse_csv output, read through its on-disk snapshot when SNAPSHOT_DIR is set.
+
+    The snapshot is written on the first parse of a file and memory-mapped
+    from then on; a new PARSER_VERSION or different file content misses it.
+    """
+    if not SNAPSHOT_DIR or not snapshots_available():
+        return parse_csv(uploaded_file)
+    path = snapshot_path(SNAPSHOT_DIR, digest, PARSER_VERSION)
+    if not os.path.exists(path):
+        df = parse_csv(uploaded_file)
+        if df is None:
+            return None
+        write_snapshot(df, path)
+    return read_snapshot(path)
+
+def get_waste_matcher():
+    """Waste keyword index for the session's configured keyword list."""
+    return WasteMatcher(st.session_state.get('waste_keywords', ST_WASTE_CATEGORIES))
+
+def load_statement_cached(uploaded_file, waste_matcher, compact=False):
+    """Returns (df, agg) for an upload through the process-wide cache.
+
+    The cache key is the file content hash plus PARSER_VERSION, the waste
+    keyword signature and the storage mode. Rows are waste-labelled once
+    here. Files above STREAMING_THRESHOLD_BYTES are streamed and keep only
+    the aggregate, so df comes back empty for them.
+    """
+    data = uploaded_file.getvalue()
+    streaming = len(data) > STREAMING_THRESHOLD_BYTES
+    digest = content_digest(data)
+    key = (digest, PARSER_VERSION, waste_matcher.signature, streaming, compact)
+    cached = PARSE_CACHE.get(key)
+    if cached is None:
+        if streaming:
+            df, agg = pd.DataFrame(), stream_csv(uploaded_file, waste_matcher)
+        else:
+            df = parse_csv_snapshot(uploaded_file, digest)
+            agg = aggregate_statement(label_waste(df, waste_matcher)) if df is not None else None
+            if agg is not None and compact:
+                df = compact_statement(df)
+        if agg is None:
+            return None, None
+        cached = (df, agg)
+        PARSE_CACHE.put(key, cached)
+    # Shallow copies so per-session column changes never leak into the shared entry
+    df, agg = cached
+    return df.copy(deep=False), agg.copy(deep=False)
+
+def upload_digest(uploaded_files):
+    """Content digest of an upload; several files get one digest over their sorted digests."""
+    digests = sorted(content_digest(uploaded_file.getvalue()) for uploaded_file in uploaded_files)
+    return digests[0] if len(digests) == 1 else content_digest(''.join(digests).encode('ascii'))
+
+def load_uploads(uploaded_files, waste_matcher, compact=False, account=None):
+    """Returns (df, agg, summary) for one or more uploaded files.
+
+    Several files are parsed concurrently, each through load_statement_cached(),
+    and merged into one date-sorted statement without the transactions they
+    share (see ingest.merge_statements). summary has one row per merged file
+    with its transaction count and dropped duplicates; it is None for a
+    single file.
+    """
+    if len(uploaded_files) == 1:
+        df, agg = load_statement_cached(uploaded_files[0], waste_matcher, compact)
+        return df, agg, None
+
+    # Worker threads get the script context so parse errors still reach the page
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(max_workers=min(len(uploaded_files), UPLOAD_WORKERS),
+                            initializer=add_script_run_ctx, initargs=(None, ctx)) as pool:
+        loaded = list(pool.map(lambda uploaded_file: load_statement_cached(uploaded_file, waste_matcher, compact),
+                               uploaded_files))
+    parsed = [(uploaded_file.name, df, agg) for uploaded_file, (df, agg) in zip(uploaded_files, loaded)
+              if agg is not None]
+    if not parsed:
+        return None, None, None
+    names, frames, aggs = zip(*parsed)
+
+    if any(frame.empty for frame in frames):
+        # Streamed files keep no rows to compare, so the aggregates are only added up
+        st.info("Some files were streamed in chunks, so overlapping transactions could not be removed.")
+        agg = combine_aggregates(list(aggs))
+        agg.attrs['dates_coerced'] = sum(part.attrs.get('dates_coerced', 0) for part in aggs)
+        summary = pd.DataFrame({'File': names, 'Transactions': [int(part['Count'].sum()) for part in aggs],
+                                'Duplicates dropped': 0})
+        return pd.DataFrame(), agg, summary
+
+    df, dropped = merge_statements(list(frames), account)
+    summary = pd.DataFrame({'File': names, 'Transactions': [len(frame) for frame in frames],
+                            'Duplicates dropped': dropped})
+    return df, aggregate_statement(df), summary
+
+def load_uploads_cached(uploaded_files, file_digests, waste_matcher, compact=False, account=None):
+    """load_uploads() for the files in the uploader, kept in the session so reruns skip the merge."""
+    key = (tuple(file_digests), waste_matcher.signature, compact, account)
+    cached = st.session_state.get('loaded_uploads')
+    if cached is None or cached[0] != key:
+        cached = (key, load_uploads(uploaded_files, waste_matcher, compact, account))
+        st.session_state['loaded_uploads'] = cached
+    return cached[1]
+
+
+def refresh_waste_labels():
+    """Relabels the session's statement when the waste keyword list has changed."""
+    waste_matcher = get_waste_matcher()
+    if st.session_state.get('waste_signature') == waste_matcher.signature:
+        return
+
+    if st.session_state.get('store_view'):
+        store = get_store()
+        if store.waste_signature != waste_matcher.signature:
+            store.relabel_waste(waste_matcher)
+        set_store_view(store, st.session_state.get('store_account'), st.session_state.get('forecast_state'))
+        st.session_state['waste_signature'] = waste_matcher.signature
+        return
+
+    df = st.session_state['df']
     if df.empty:
-        st.error("No valid date entries found in the CSV.")
+        st.sidebar.warning("Re-upload the statement to apply new waste keywords to a streamed file.")
+        return
+    df = label_waste(df.copy(deep=False), waste_matcher)
+    set_statement(df, aggregate_statement(df), st.session_state.get('forecast_state'),
+                  st.session_state.get('anomaly_detector'))
+    st.session_state['waste_signature'] = waste_matcher.signature
+
+def set_statement(df, agg, forecast_state=None, anomaly_detector=None):
+    """Stores the session's statement and builds its period cube and forecast state once.
+
+    Without an anomaly_detector, the statement's rows are scored in one pass
+    by a new one.
+    """
+    if anomaly_detector is None and not df.empty:
+        anomaly_detector = AnomalyDetector()
+        label_anomalies(df, anomaly_detector)
+    st.session_state['df'] = df
+    st.session_state['agg'] = agg
+    st.session_state['cube'] = PeriodCube(agg, df)
+    st.session_state['store_view'] = False
+    if forecast_state is None:
+        forecast_state = ForecastState.from_monthly(monthly_category_totals(agg))
+    st.session_state['forecast_state'] = forecast_state
+    st.session_state['anomaly_detector'] = anomaly_detector
+    start_precompute()
+
+def get_store():
+    """The configured transaction store, or None when statements live in the session only."""
+    return open_store(STORE_PATH) if STORE_PATH else None
+
+def select_date(year, month, day):
+    """Points the period selectors of the Manage and Analyze pages at the given date."""
+    st.session_state['selected_year'] = year
+    st.session_state['selected_month_name'] = ST_MONTH_NAMES[month - 1]
+    st.session_state['selected_week'] = get_week_of_month(day)
+
+def set_store_view(store, account=None, forecast_state=None):
+    """Points the pages at the transaction store (all accounts, or one) instead of a session statement."""
+    cube = StoreCube(store, account)
+    # Another account need not cover the selected period, so it starts at its own latest date
+    if cube.latest is not None and (account != st.session_state.get('store_account')
+                                    or st.session_state.get('selected_year') not in cube.years):
+        select_date(*cube.latest)
+    st.session_state['df'] = pd.DataFrame()
+    st.session_state['agg'] = pd.DataFrame()
+    st.session_state['cube'] = cube
+    st.session_state['store_view'] = True
+    st.session_state['store_account'] = account
+    st.session_state['anomaly_detector'] = None
+    st.session_state['statement_upload'] = None
+    if forecast_state is None:
+        forecast_state = ForecastState.from_monthly(cube.monthly_category_totals())
+    st.session_state['forecast_state'] = forecast_state
+    st.session_state['waste_signature'] = store.waste_signature
+    start_precompute()
+
+def append_statement(new_df, new_agg, account=None):
+    """Appends an upload to the session's statement, dropping transactions it already holds.
+
+    The forecast state is updated with just the new months, and the anomaly
+    detector scores just the new rows. Uploads that repeat transactions,
+    overlap or predate data already seen trigger a full rebuild instead.
+    Returns the number of appended transactions dropped as duplicates.
+    """
+    anomaly_detector = st.session_state.get('anomaly_detector')
+    if anomaly_detector is not None and not new_df.empty and label_anomalies(new_df, anomaly_detector) is None:
+        anomaly_detector = None
+    df = st.session_state['df']
+    if df.empty or new_df.empty:
+        df = pd.DataFrame()  # Row-level detail only survives if both parts kept it
+        anomaly_detector = None  # ... and so do the scored rows the Manage page lists
+        dropped = 0
+    else:
+        df, (_, dropped) = merge_statements([df, new_df], account)
+    if dropped:
+        # The upload's totals and scores include the repeated transactions, so all of it is rebuilt
+        set_statement(df, aggregate_statement(df))
+        st.session_state['statement_upload'] = None
+        return dropped
+    agg = combine_aggregates([st.session_state['agg'], new_agg])
+
+    forecast_state = st.session_state.get('forecast_state')
+    if forecast_state is not None and not forecast_state.update(monthly_category_totals(new_agg)):
+        st.info("The appended statement overlaps months already loaded, so forecasts were rebuilt from scratch.")
+        forecast_state = None
+    set_statement(df, agg, forecast_state, anomaly_detector)
+    st.session_state['statement_upload'] = None  # The statement is no longer just the last upload
+    return 0
+
+def save_to_store(store, digest, df, agg, account, waste_matcher):
+    """Bulk-inserts an upload into the store (once per file) and points the pages at the store.
+
+    Returns the number of transactions inserted. When the pages already show
+    every account, the forecast state takes the upload's months incrementally.
+    """
+    inserted = store.insert_statement(df, digest, account)
+    if store.waste_signature != waste_matcher.signature:
+        store.relabel_waste(waste_matcher)
+    if inserted or not st.session_state.get('store_view'):
+        forecast_state = None
+        if inserted and st.session_state.get('store_view') and st.session_state.get('store_account') is None:
+            forecast_state = st.session_state.get('forecast_state')
+            if forecast_state is not None and not forecast_state.update(monthly_category_totals(agg)):
+                forecast_state = None
+        set_store_view(store, None, forecast_state)
+    return inserted
+
+
+def statement_category_monthly(cube, agg, store_view):
+    """Sequenced monthly category totals of a session statement, or of the store through its cube."""
+    if store_view:
+        return number_category_months(cube.monthly_category_totals())
+    return build_category_monthly(agg)
+
+def session_category_monthly():
+    """Sequenced monthly category totals of the statement the pages show."""
+    return statement_category_monthly(st.session_state['cube'], st.session_state['agg'],
+                                      st.session_state.get('store_view'))
+
+def compute_forecast(model, ridge, forecast_state, category_monthly):
+    """Forecast table of the model; category_monthly() is only called when the model needs a full refit."""
+    results_df = forecast_state.forecast() if model == 'linear' and forecast_state is not None else None
+    if results_df is None:
+        # Full refit: aggregate monthly data by category and fit all categories in one batched pass,
+        # unless any session already forecast the same monthly series with the same model
+        results_df = cached_forecast(category_monthly(), make_forecaster(model, ridge))
+    return results_df
+
+
+# --- Background Precomputation ---
+def start_precompute():
+    """Cancels stale precomputation and starts computing every page's aggregates for the current statement."""
+    job = st.session_state.get('precompute')
+    if job is not None:
+        job.cancel()
+    cube, agg, store_view = st.session_state['cube'], st.session_state['agg'], st.session_state.get('store_view')
+    forecast_state = st.session_state.get('forecast_state')
+    model = st.session_state.get('forecast_model', 'linear')
+    ridge = st.session_state.get('forecast_ridge', 0.0) if model == 'seasonal' else 0.0
+    # The worker thread has no session state, so the forecast closes over this statement's objects
+    category_monthly = lambda: statement_category_monthly(cube, agg, store_view)
+    st.session_state['precompute'] = PagePrecomputer(cube, {
+        (model, ridge): lambda: compute_forecast(model, ridge, forecast_state, category_monthly),
+    }).start()
+
+def precomputed(kind, *args):
+    """A finished background result for the cube the pages show, or None."""
+    job = st.session_state.get('precompute')
+    if job is None or job.cube is not st.session_state.get('cube'):
         return None
-        
-    df['Year'] = df['DateObj'].dt.year
-    df['Month'] = df['DateObj'].dt.month
-    df['Day'] = df['DateObj'].dt.day
-    df['WeekOfMonth'] = df['Day'].apply(get_week_of_month)
-    
-    # Ensure Description column for manager.js logic emulation (use Category as fallback)
-    if 'Description' not in df.columns:
-        df['Description'] = df['Category']
-        
-    return df.sort_values('DateObj')
+    return job.get(kind, *args)
 
+def period_result(cube, kind, scope, year, month, week):
+    """Page aggregate of a period: the background result once finished, otherwise computed now."""
+    value = precomputed(kind, scope, year, month, week)
+    return period_aggregate(cube, kind, scope, year, month, week) if value is None else value
 
-# --- Filtering Utility (Used by Manage and Analyze) ---
-def filter_data(df, scope, year, month_name, week):
-    """Filters DataFrame based on selected scope and period."""
-    if df.empty: return df
+def precompute_pending():
+    job = st.session_state.get('precompute')
+    return job is not None and job.running
 
-    filtered_df = df.copy()
-    month = ST_MONTH_NAMES.index(month_name) + 1 if month_name else None
+@st.fragment(run_every=0.5)
+def render_precompute_progress():
+    """Progress bar that refreshes itself while the background precomputation runs.
 
-    if year:
-        filtered_df = filtered_df[filtered_df['Year'] == year]
+    Only rendered while a job is pending. Once it finishes, one full rerun
+    drops the fragment, so idle sessions stop polling.
+    """
+    if not precompute_pending():
+        st.rerun()
+    job = st.session_state['precompute']
+    st.progress(job.progress, text=f"Precomputing page data: {job.progress:.0%}")
 
-    if scope in ['monthly', 'weekly'] and month:
-        filtered_df = filtered_df[filtered_df['Month'] == month]
 
-    if scope == 'weekly' and week:
-        filtered_df = filtered_df[filtered_df['WeekOfMonth'] == week]
+# --- Filtering Utility (Used by Manage and Analyze) ---
+def filter_data(cube, scope, year, month_name, week):
+    """Expense rows of the selected scope and period, fetched by date index range."""
+    month = ST_MONTH_NAMES.index(month_name) + 1 if month_name else None
+    return cube.rows(scope, year, month, week)
 
-    # Exclude non-expense categories from spending totals
-    expense_df = filtered_df[
-        (filtered_df['Amount'] > 0) & 
-        (~filtered_df['Category'].isin(['Income', 'Savings', 'Transfer']))
-    ]
-    
-    return expense_df
+
+# --- Profiling ---
+def get_profiler():
+    """The session's stage profiler, created on first use."""
+    if 'profiler' not in st.session_state:
+        st.session_state['profiler'] = StageProfiler(export_path=PROFILE_LOG_PATH)
+    return st.session_state['profiler']
+
+def render_perf_panel(profiler):
+    """Collapsible sidebar panel with the stage timings of the last reruns."""
+    if not profiler.runs:
+        return
+    with st.sidebar.expander(f"⏱ Performance (last {len(profiler.runs)} reruns)"):
+        latest = profiler.runs[-1]
+        st.caption(f"Latest rerun: {latest['page']} in {latest['seconds'] * 1000:.1f} ms")
+        stages = pd.DataFrame(latest['stages'], columns=['stage', 'seconds', 'rows', 'memory_delta_mb'])
+        stages['ms'] = stages.pop('seconds') * 1000
+        st.dataframe(stages[['stage', 'ms', 'rows', 'memory_delta_mb']], use_container_width=True, hide_index=True)
+
+        history = pd.DataFrame({
+            'page': [run['page'] for run in profiler.runs],
+            'ms': [run['seconds'] * 1000 for run in profiler.runs],
+            'stages': [len(run['stages']) for run in profiler.runs],
+        })
+        st.dataframe(history.iloc[::-1], use_container_width=True, hide_index=True)
+        st.download_button("Export JSON lines", profiler.to_jsonl(), file_name='stage_timings.jsonl',
+                           mime='application/x-ndjson')
 
 
 # --- Pages ---
 
 def home_page():
     st.markdown('<div class="card"><h2>Upload Your Bank Statement</h2></div>', unsafe_allow_html=True)
-    uploaded_file = st.file_uploader("Upload CSV", type=['csv'])
-    if uploaded_file:
-        df = parse_csv(uploaded_file)
-        if df is not None and not df.empty:
-            st.session_state['df'] = df
-            
-            # Set initial selection to the latest date
-            latest_date = df['DateObj'].max()
-            st.session_state['selected_year'] = latest_date.year
-            st.session_state['selected_month_name'] = ST_MONTH_NAMES[latest_date.month - 1]
-            st.session_state['selected_week'] = get_week_of_month(latest_date.day)
+    uploaded_files = st.file_uploader("Upload CSV", type=['csv'], accept_multiple_files=True)
+    compact = st.checkbox("Compact storage (less memory per session)", key='compact_storage')
+    append = st.checkbox("Append to the current statement", key='append_statement')
+    store = get_store()
+    account = None
+    if store is not None:
+        account = st.text_input("Account", value=DEFAULT_ACCOUNT, key='store_account_name')
+    if uploaded_files:
+        profiler = get_profiler()
+        waste_matcher = get_waste_matcher()
+        file_digests = [content_digest(uploaded_file.getvalue()) for uploaded_file in uploaded_files]
+        with profiler.stage('parse_csv') as stage:
+            df, agg, merge_summary = load_uploads_cached(uploaded_files, file_digests, waste_matcher, compact,
+                                                         account)
+            stage.rows = len(df) if df is not None else None
+        appended_dropped = None
+        if agg is not None and not agg.empty:
+            with profiler.stage('set_statement', rows=len(agg)):
+                if store is not None and not df.empty:
+                    inserted = save_to_store(store, upload_digest(uploaded_files), df, agg, account, waste_matcher)
+                elif append and not st.session_state['agg'].empty:
+                    # Reruns keep files in the uploader, and the file that built the statement may still be
+                    # there; only files not yet part of the statement are appended
+                    statement_files = st.session_state.setdefault('statement_files', set())
+                    new_files = [uploaded_file for uploaded_file, digest in zip(uploaded_files, file_digests)
+                                 if digest not in statement_files]
+                    if new_files:
+                        if len(new_files) < len(uploaded_files):
+                            df, agg, merge_summary = load_uploads(new_files, waste_matcher, compact, account)
+                        appended_dropped = append_statement(df, agg, account)
+                        statement_files.update(file_digests)
+                    else:
+                        merge_summary = None  # Describes files appended on an earlier rerun
+                    df, agg = st.session_state['df'], st.session_state['agg']
+                else:
+                    # Reruns keep the upload in the uploader; the statement (cube, forecast state, anomaly
+                    # scores, background job) is only rebuilt when the upload or how it is loaded changes
+                    upload_key = (tuple(sorted(file_digests)), waste_matcher.signature, compact, store is not None)
+                    if st.session_state.get('statement_upload') != upload_key:
+                        set_statement(df, agg)
+                        st.session_state['statement_files'] = set(file_digests)
+                        st.session_state['statement_upload'] = upload_key
+            st.session_state['waste_signature'] = waste_matcher.signature
+
+            # Set initial selection to the latest date (the aggregate is sorted by date)
+            latest = agg.iloc[-1]
+            select_date(latest['Year'], latest['Month'], latest['Day'])
 
             st.success("File uploaded and processed successfully!")
-            st.dataframe(df.head(), use_container_width=True)
-        elif df is not None:
+            if merge_summary is not None:
+                dropped = int(merge_summary['Duplicates dropped'].sum())
+                st.info(f"Merged {len(merge_summary)} files: dropped {dropped:,} duplicate transactions "
+                        f"that appeared in more than one file.")
+                st.dataframe(merge_summary, use_container_width=True, hide_index=True)
+            if appended_dropped:
+                st.info(f"Dropped {appended_dropped:,} appended transactions that were already in the statement.")
+            if store is not None:
+                if df.empty:
+                    st.warning("Streamed statements are not saved to the store; they are kept for this session only.")
+                else:
+                    st.caption(f"Saved {inserted:,} new transactions to the store." if inserted
+                               else "Every transaction in this statement is already in the store.")
+            if df.empty:
+                st.info("Large statement streamed in chunks: totals, trends and forecasts are available, "
+                        "row-level detail is not kept.")
+                with profiler.stage('render_dataframe', rows=5):
+                    st.dataframe(agg.head(), use_container_width=True)
+            else:
+                with profiler.stage('render_dataframe', rows=5):
+                    st.dataframe(df.head(), use_container_width=True)
+                if 'bytes_per_row_before' in df.attrs:
+                    st.caption(f"Compact storage: {df.attrs['bytes_per_row_before']:.0f} → "
+                               f"{bytes_per_row(df):.0f} bytes per row")
+
+            dates_coerced = (agg if df.empty else df).attrs.get('dates_coerced', 0)
+            if dates_coerced:
+                st.caption(f"{dates_coerced} rows had unparseable dates and were skipped.")
+
+            cache_stats = PARSE_CACHE.stats()
+            st.caption(f"Parse cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                       f"{cache_stats['entries']} entries ({cache_stats['bytes'] / 1024 ** 2:.1f} MB)")
+        elif agg is not None:
             st.warning("Processed file is empty or contains no valid data.")
 
+    if store is not None and st.session_state.get('store_view'):
+        accounts = store.accounts()
+        if len(accounts) > 1:
+            choice = st.selectbox("Show account", ['All accounts'] + accounts, key='store_view_account')
+            shown = None if choice == 'All accounts' else choice
+            if shown != st.session_state.get('store_account'):
+                set_store_view(store, shown)
+
 # ----------------------------------------------------------------------
 def manage_page():
     st.markdown('<h2>Manage Spending</h2>', unsafe_allow_html=True)
-    if 'df' not in st.session_state or st.session_state['df'].empty:
+    if st.session_state.get('cube') is None:
         st.warning("Upload CSV in Home first.")
         return
     
-    df = st.session_state['df']
-    unique_years = sorted(df['Year'].unique(), reverse=True)
+    unique_years = st.session_state['cube'].years
 
     # --- Sidebar Filters ---
     st.sidebar.markdown('### Manage Scope')
@@ -217,9 +606,19 @@ def manage_page():
     st.session_state['selected_year'] = year
     if month_name: st.session_state['selected_month_name'] = month_name
 
+    st.sidebar.markdown('### Waste Keywords')
+    keywords_text = st.sidebar.text_area('Waste keywords (comma separated)',
+                                         ', '.join(st.session_state.get('waste_keywords', ST_WASTE_CATEGORIES)))
+    st.session_state['waste_keywords'] = [k.strip() for k in keywords_text.split(',') if k.strip()]
+    profiler = get_profiler()
+    with profiler.stage('refresh_waste_labels'):
+        refresh_waste_labels()
+    cube = st.session_state['cube']
+
     # --- Data Filtering and Summary ---
-    current_data = filter_data(df, scope, year, month_name, None)
-    total_spent = current_data['Amount'].sum()
+    month = ST_MONTH_NAMES.index(month_name) + 1 if month_name else None
+    with profiler.stage('filter_data'):
+        total_spent = period_result(cube, 'total', scope, year, month, None)
     
     summary_text = f"Summary ({month_name} {year})" if scope == 'monthly' else f"Summary ({year})"
 
@@ -229,56 +628,84 @@ def manage_page():
     # --- Waste Analysis Logic (Manager.js emulation) ---
     st.markdown('<div class="card"><h3>💰 Where is the Money Wasted?</h3>', unsafe_allow_html=True)
     
-    # Filter for waste (Category or Description keyword match)
-    waste_data = current_data[
-        current_data.apply(lambda row: 
-            row['Category'] in ST_WASTE_CATEGORIES or 
-            any(keyword.lower() in str(row.get('Description', '')).lower() for keyword in ST_WASTE_CATEGORIES), 
-            axis=1
-        )
-    ]
+    # Waste by Category (flags from the Category or Description keyword match at ingest)
+    with profiler.stage('waste_summary') as stage:
+        waste_summary = period_result(cube, 'waste', scope, year, month, None)
+        stage.rows = len(waste_summary)
     
-    if waste_data.empty:
+    if waste_summary.empty:
         st.markdown("<p>Great job! We didn't find any high-waste activities in your spending for this period.</p>", unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-        return
+    else:
+        total_waste = waste_summary['Amount'].sum()
 
-    # Group and sum waste by Category
-    waste_summary = waste_data.groupby('Category')['Amount'].sum().reset_index()
-    waste_summary = waste_summary.sort_values('Amount', ascending=False)
-    total_waste = waste_summary['Amount'].sum()
+        st.markdown(f'<p>You spent a total of <strong>${total_waste:.2f}</strong> on the following high-waste activities this period:</p>', unsafe_allow_html=True)
 
-    st.markdown(f'<p>You spent a total of <strong>${total_waste:.2f}</strong> on the following high-waste activities this period:</p>', unsafe_allow_html=True)
-    
-    waste_html = '<ul class="waste-list">'
-    for _, row in waste_summary.iterrows():
-        category = row['Category']
-        amount = row['Amount']
-        percentage = (amount / total_waste) * 100
-        
-        waste_html += f"""
-            <li class="waste-item">
-                <strong class="waste-amount">${amount:.2f}</strong> wasted on <strong>{category}</strong> ({percentage:.1f}%)
-                <div class="waste-bar">
-                    <div class="waste-fill" style="width: {percentage:.1f}%;"></div>
-                </div>
-            </li>
-        """
-    waste_html += '</ul>'
-    # FIX: Set unsafe_allow_html=True for the waste list content
-    st.markdown(waste_html, unsafe_allow_html=True) 
+        with profiler.stage('build_html', rows=len(waste_summary)):
+            waste_html = waste_list_html(waste_summary)
+        # FIX: Set unsafe_allow_html=True for the waste list content
+        with profiler.stage('render_html'):
+            st.markdown(waste_html, unsafe_allow_html=True)
+
+    st.markdown('</div>', unsafe_allow_html=True)
 
+    # --- Unusual Charges (anomaly flags scored at ingest) ---
+    if st.session_state.get('anomaly_detector') is None or not cube.has_rows:
+        return  # Store views and streamed statements keep no scored rows
+    with profiler.stage('anomalies') as stage:
+        period_rows = cube.rows(scope, year, month, None)
+        if 'Anomaly' not in period_rows.columns:
+            return
+        anomalies = period_rows[period_rows['Anomaly'].to_numpy(dtype=bool)]
+        stage.rows = len(anomalies)
+
+    st.markdown('<div class="card"><h3>🚨 Unusual Charges</h3>', unsafe_allow_html=True)
+    if anomalies.empty:
+        st.markdown("<p>No charge this period was far above the usual amount for its category or description.</p>", unsafe_allow_html=True)
+    else:
+        st.markdown(f'<p>{len(anomalies)} charge{"s" if len(anomalies) != 1 else ""} this period {"were" if len(anomalies) != 1 else "was"} far above the usual amount for the category or description:</p>', unsafe_allow_html=True)
+        with profiler.stage('build_html', rows=len(anomalies)):
+            anomaly_html = anomaly_list_html(anomalies)
+        st.markdown(anomaly_html, unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
+def render_statement_window(statement_df, profiler):
+    """Detailed Statement with server-side search, sort and pagination.
+
+    Only the visible page is formatted and sent to the browser.
+    """
+    first_page = lambda: st.session_state.update(statement_page=1)
+    col_search, col_sort, col_order, col_size = st.columns([3, 2, 1, 1])
+    search = col_search.text_input('Search category or description', key='statement_search', on_change=first_page)
+    sort_by = col_sort.selectbox('Sort by', STATEMENT_SORT_COLUMNS, key='statement_sort', on_change=first_page)
+    descending = col_order.checkbox('Descending', key='statement_descending', on_change=first_page)
+    page_size = col_size.selectbox('Rows per page', STATEMENT_PAGE_SIZES, index=1, key='statement_page_size',
+                                   on_change=first_page)
+
+    with profiler.stage('statement_window', rows=len(statement_df)) as stage:
+        page = st.session_state.get('statement_page', 1)
+        display_df, matched = statement_window(statement_df, search, sort_by, descending, page, page_size)
+        pages = max(1, -(-matched // page_size))
+        if page > pages:
+            # The period or search shrank the result; show its last page instead
+            page = pages
+            display_df, matched = statement_window(statement_df, search, sort_by, descending, page, page_size)
+        stage.rows = matched
+    st.session_state['statement_page'] = page
+
+    with profiler.stage('render_dataframe', rows=len(display_df)):
+        st.dataframe(display_df, use_container_width=True, hide_index=True)
+    st.number_input('Page', min_value=1, max_value=pages, step=1, key='statement_page')
+    st.caption(f"Page {page} of {pages}: {matched:,} matching transactions")
+
 # ----------------------------------------------------------------------
 def analyze_page():
     st.markdown('<h2>Analyze Spending</h2>', unsafe_allow_html=True)
-    if 'df' not in st.session_state or st.session_state['df'].empty:
+    if st.session_state.get('cube') is None:
         st.warning("Upload CSV in Home first.")
         return
     
-    df = st.session_state['df']
-    unique_years = sorted(df['Year'].unique(), reverse=True)
+    cube = st.session_state['cube']
+    unique_years = cube.years
     
     # --- Sidebar Filters ---
     st.sidebar.markdown('### Analysis Scope')
@@ -296,9 +723,7 @@ def analyze_page():
     if scope == 'weekly':
         # Determine max week based on selected year and month
         month_index = ST_MONTH_NAMES.index(month_name) + 1 if month_name else 1
-        max_week = df[
-            (df['Year'] == year) & (df['Month'] == month_index)
-        ]['WeekOfMonth'].max() if month_name else 5
+        max_week = cube.max_week(year, month_index) if month_name else 5
         weeks = list(range(1, int(max_week) + 1))
         # Ensure default selection is within bounds
         default_week = st.session_state.get('selected_week', 1)
@@ -312,39 +737,28 @@ def analyze_page():
     if week: st.session_state['selected_week'] = week
 
     # --- Data Filtering ---
-    filtered_df = filter_data(df, scope, year, month_name, week)
+    month = ST_MONTH_NAMES.index(month_name) + 1 if month_name else None
+    profiler = get_profiler()
+    with profiler.stage('category_totals') as stage:
+        category_summary = period_result(cube, 'categories', scope, year, month, week)
+        stage.rows = len(category_summary)
     
     # --- Analysis Components ---
     col1, col2 = st.columns(2)
 
     with col1:
         st.markdown('<div class="card"><h3>Split Up by Category</h3>', unsafe_allow_html=True)
-        if filtered_df.empty:
+        if category_summary.empty:
             st.markdown('<p>No expenses found for this period.</p>', unsafe_allow_html=True)
         else:
-            category_summary = filtered_df.groupby('Category')['Amount'].sum().sort_values(ascending=False).reset_index()
             total_expense = category_summary['Amount'].sum()
             
             # Emulate Pie Chart with HTML/CSS for visualization
-            chart_html = '<ul style="list-style-type: none; padding: 0; text-align: left;">'
-            for _, row in category_summary.iterrows():
-                category = row['Category']
-                amount = row['Amount']
-                percentage = (amount / total_expense) * 100
-                # Color logic from analysis.js: highlight food/delivery/cab categories
-                color = '#ff7f0e' if any(w in category for w in ['Food', 'Delivery', 'Cab', 'Bar']) else '#d9534f'
-                
-                chart_html += f"""
-                    <li style="margin-bottom: 5px;">
-                        <strong>{category}:</strong> ${amount:.2f} ({percentage:.1f}%)
-                        <div style="height: 10px; background-color: #eee; border-radius: 5px; margin-top: 3px;">
-                            <div class="category-bar-fill" style="width: {percentage:.1f}%; background-color: {color};"></div>
-                        </div>
-                    </li>
-                """
-            chart_html += '</ul>'
+            with profiler.stage('build_html', rows=len(category_summary)):
+                chart_html = category_bars_html(category_summary)
             # FIX: Set unsafe_allow_html=True for the category split list content
-            st.markdown(chart_html, unsafe_allow_html=True) 
+            with profiler.stage('render_html'):
+                st.markdown(chart_html, unsafe_allow_html=True) 
         st.markdown('</div>', unsafe_allow_html=True)
 
     with col2:
@@ -355,160 +769,122 @@ def analyze_page():
         }.get(scope, 'Spending Trend')
         st.markdown(f'<div class="card"><h3 id="trendTitle">{trend_title}</h3>', unsafe_allow_html=True)
 
-        if filtered_df.empty:
+        with profiler.stage('trend') as stage:
+            trend_data = period_result(cube, 'trend', scope, year, month, week)
+            stage.rows = len(trend_data)
+        if trend_data.empty:
             st.markdown('<p>No spending data to visualize trends.</p>', unsafe_allow_html=True)
         else:
-            # Grouping key logic (analysis.js emulation)
-            if scope == 'yearly':
-                trend_data = filtered_df.groupby('Month')['Amount'].sum().reset_index()
-                trend_data['Period'] = trend_data['Month'].apply(lambda m: ST_MONTH_NAMES[m - 1])
-                st.bar_chart(trend_data.set_index('Period')['Amount'], use_container_width=True)
-            elif scope == 'monthly':
-                trend_data = filtered_df.groupby('WeekOfMonth')['Amount'].sum().reset_index()
-                trend_data['Period'] = trend_data['WeekOfMonth'].apply(lambda w: f'Week {w}')
-                st.bar_chart(trend_data.set_index('Period')['Amount'], use_container_width=True)
-            elif scope == 'weekly':
-                # Use standard line chart for daily trend as in original JS logic
-                trend_data = filtered_df.groupby('DateObj')['Amount'].sum().reset_index()
-                trend_data['Period'] = trend_data['DateObj'].dt.date
-                st.line_chart(trend_data.set_index('Period')['Amount'], use_container_width=True)
+            with profiler.stage('render_chart', rows=len(trend_data)):
+                # Grouping key logic (analysis.js emulation)
+                if scope == 'yearly':
+                    trend_data['Period'] = trend_data['Month'].apply(lambda m: ST_MONTH_NAMES[m - 1])
+                    st.bar_chart(trend_data.set_index('Period')['Amount'], use_container_width=True)
+                elif scope == 'monthly':
+                    trend_data['Period'] = trend_data['WeekOfMonth'].apply(lambda w: f'Week {w}')
+                    st.bar_chart(trend_data.set_index('Period')['Amount'], use_container_width=True)
+                elif scope == 'weekly':
+                    # Use standard line chart for daily trend as in original JS logic
+                    trend_data['Period'] = pd.to_datetime(trend_data['DateKey'].astype(str), format='%Y%m%d').dt.date
+                    st.line_chart(trend_data.set_index('Period')['Amount'], use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
     # --- Detailed Statement ---
     st.markdown('<div class="card full-width"><h3>Detailed Statement</h3>', unsafe_allow_html=True)
-    if filtered_df.empty:
+    if category_summary.empty:
         st.info("No data available for this selection.")
+    elif not cube.has_rows:
+        st.info("Row-level detail is not kept for statements that were streamed in chunks.")
     else:
-        # Select the relevant columns for display
-        display_df = filtered_df[['DateObj', 'Category', 'Amount']].copy()
-        display_df.rename(columns={'DateObj': 'Date', 'Amount': 'Amount ($)'}, inplace=True)
-        # Format amount to 2 decimal places
-        display_df['Amount ($)'] = display_df['Amount ($)'].apply(lambda x: f"${x:.2f}")
-        st.dataframe(display_df, use_container_width=True, hide_index=True)
+        with profiler.stage('filter_data') as stage:
+            statement_df = filter_data(cube, scope, year, month_name, week)
+            stage.rows = len(statement_df)
+        render_statement_window(statement_df, profiler)
     st.markdown('</div>', unsafe_allow_html=True)
 
 # ----------------------------------------------------------------------
 def predict_page():
     st.markdown('<h2>Predict Spending</h2>', unsafe_allow_html=True)
-    if 'df' not in st.session_state or st.session_state['df'].empty:
+    if st.session_state.get('cube') is None:
         st.warning("Upload CSV in Home first.")
         return
     
-    df = st.session_state['df']
-    
-    # 1. Aggregate Monthly Data by Category (prediction.js logic)
-    category_monthly = df[~df['Category'].isin(['Income', 'Savings', 'Transfer'])]
-    category_monthly = category_monthly.groupby(['Year', 'Month', 'Category'])['Amount'].sum().reset_index()
-
-    # Filter out categories with less than 2 months of data for trend calculation
-    valid_categories = category_monthly['Category'].value_counts()
-    valid_categories = valid_categories[valid_categories >= 2].index
-    category_monthly = category_monthly[category_monthly['Category'].isin(valid_categories)]
+    # --- Sidebar: Forecast Model ---
+    st.sidebar.markdown('### Forecast Model')
+    model = st.sidebar.selectbox('Model', list(FORECASTERS), format_func=lambda key: FORECASTERS[key].name,
+                                 key='forecast_model')
+    ridge = 0.0
+    if model == 'seasonal':
+        ridge = st.sidebar.number_input('Ridge penalty', min_value=0.0, value=0.0, step=0.5, key='forecast_ridge')
+
+    # 1-2. Forecasts from the background precomputation, else straight from the incremental state
+    # (linear, per-category sufficient statistics) or a batched refit
+    profiler = get_profiler()
+    with profiler.stage('forecast') as stage:
+        results_df = precomputed('forecast', model, ridge)
+        if results_df is None:
+            results_df = compute_forecast(model, ridge, st.session_state.get('forecast_state'),
+                                          session_category_monthly)
+        stage.rows = len(results_df)
 
-    if category_monthly.empty:
+    if results_df.empty:
         st.error("Need at least 2 months of historical expense data in a category for prediction.")
         return
 
-    # Create a global sequence number (prediction.js logic)
-    monthly_map = category_monthly.groupby(['Year', 'Month']).size().reset_index().sort_values(['Year', 'Month'])
-    monthly_map['seq'] = monthly_map.index + 1
-    category_monthly = pd.merge(category_monthly, monthly_map[['Year', 'Month', 'seq']], on=['Year', 'Month'])
-
-    # 2. Run Linear Regression and Forecast for Each Category (prediction.js logic)
-    results = []
-    max_sequence = category_monthly['seq'].max()
-    next_sequence = max_sequence + 1
-    
-    for category in valid_categories:
-        data = category_monthly[category_monthly['Category'] == category]
-        
-        # Linear Regression: y = mx + b (x=seq, y=Amount)
-        try:
-            m, b = np.polyfit(data['seq'], data['Amount'], 1)
-        except np.linalg.LinAlgError:
-            m, b = 0, data['Amount'].mean() # Fallback to mean if linear fit fails
-        
-        # Prediction for next month and next year (sequence N+1 and N+12)
-        forecasted_month = max(0, m * next_sequence + b)
-        # Forecasted spending one year from now (N+12) and multiply by 12 months for annual projection
-        forecasted_year_amount = max(0, m * (next_sequence + 11) + b)
-        forecasted_year_total = forecasted_year_amount * 12
-
-        # Calculate MSE
-        predicted_y = m * data['seq'] + b
-        mse = np.mean((data['Amount'] - predicted_y) ** 2)
-
-        results.append({
-            'Category': category,
-            'Next Month Forecast': forecasted_month,
-            'Next Year Total Forecast': forecasted_year_total,
-            'MSE Loss': mse
-        })
-        
-    results_df = pd.DataFrame(results).sort_values('Category')
+    valid_categories = results_df['Category']
 
     # --- 3. Render Results ---
-    st.markdown('<div class="card"><h3>📈 Linear Regression Forecast Results</h3>', unsafe_allow_html=True)
+    title = 'Linear Regression' if model == 'linear' else 'Trend + Seasonality'
+    st.markdown(f'<div class="card"><h3>📈 {title} Forecast Results</h3>', unsafe_allow_html=True)
     
-    if results_df.empty:
-        st.info("Not enough data to run category-specific prediction.")
-    else:
-        # Calculate Totals
-        total_next_month = results_df['Next Month Forecast'].sum()
-        total_next_year = results_df['Next Year Total Forecast'].sum()
-
-        # Format DataFrame for display (HTML Table emulation)
-        display_df = results_df.copy()
-        display_df['Next Month Forecast'] = display_df['Next Month Forecast'].apply(lambda x: f'${x:.2f}')
-        display_df['Next Year Total Forecast'] = display_df['Next Year Total Forecast'].apply(lambda x: f'${x:.2f}')
-        display_df['MSE Loss'] = display_df['MSE Loss'].apply(lambda x: f'{x:.2f}')
-        
-        # Custom HTML table rendering to include the TOTAL row 
-        table_html = """
-        <table class="prediction-table">
-            <thead>
-                <tr>
-                    <th>Category</th>
-                    <th>Next Month Forecast</th>
-                    <th>Next Year Total Forecast</th>
-                    <th>MSE Loss</th>
-                </tr>
-            </thead>
-            <tbody>
-        """
-        for _, row in display_df.iterrows():
-            table_html += f"""
-                <tr>
-                    <td class="category-name">{row['Category']}</td>
-                    <td>{row['Next Month Forecast']}</td>
-                    <td>{row['Next Year Total Forecast']}</td>
-                    <td>{row['MSE Loss']}</td>
-                </tr>
-            """
-        table_html += f"""
-            <tr class="total-row">
-                <td class="category-name"><strong>TOTAL FORECAST</strong></td>
-                <td><strong>${total_next_month:.2f}</strong></td>
-                <td><strong>${total_next_year:.2f}</strong></td>
-                <td>N/A</td>
-            </tr>
-        """
-        table_html += '</tbody></table>'
-        # FIX: Set unsafe_allow_html=True for the prediction table content
+    with profiler.stage('build_html', rows=len(results_df)):
+        table_html = forecast_table_html(results_df)
+    # FIX: Set unsafe_allow_html=True for the prediction table content
+    with profiler.stage('render_html'):
         st.markdown(table_html, unsafe_allow_html=True) 
 
+    cache_stats = FORECAST_CACHE.stats()
+    st.caption(f"Forecast cache: {cache_stats['hits']} hits, {cache_stats['disk_hits']} disk hits, "
+               f"{cache_stats['misses']} misses, {cache_stats['evictions']} evictions, "
+               f"{cache_stats['entries']} entries ({cache_stats['bytes'] / 1024 ** 2:.1f} MB)")
     st.markdown('</div>', unsafe_allow_html=True)
     
     # Model Details Rationale
-    st.markdown('<div class="card"><h3>💡 Model Rationale: Simple Linear Regression</h3>', unsafe_allow_html=True)
-    st.markdown(f"""
-        <p>
-            This forecast uses a **Simple Linear Regression Model** ($y = mx + b$) applied **individually to each spending category's historical monthly data** (for {len(valid_categories)} categories with sufficient data).
-        </p>
-        <p>
-            The model calculates a best-fit straight line based on the monthly sequence (x) and the category spending (y) to project future trends.
-        </p>
-    """, unsafe_allow_html=True)
+    if model == 'linear':
+        st.markdown('<div class="card"><h3>💡 Model Rationale: Simple Linear Regression</h3>', unsafe_allow_html=True)
+        st.markdown(f"""
+            <p>
+                This forecast uses a **Simple Linear Regression Model** ($y = mx + b$) applied **individually to each spending category's historical monthly data** (for {len(valid_categories)} categories with sufficient data).
+            </p>
+            <p>
+                The model calculates a best-fit straight line based on the monthly sequence (x) and the category spending (y) to project future trends.
+            </p>
+        """, unsafe_allow_html=True)
+    else:
+        st.markdown('<div class="card"><h3>💡 Model Rationale: Trend + Seasonality</h3>', unsafe_allow_html=True)
+        st.markdown(f"""
+            <p>
+                This forecast fits a **trend line plus a month-of-year effect** ($y = a + bx + s_{{month}}$) to each spending category's historical monthly data (for {len(valid_categories)} categories with sufficient data), all categories solved together.
+            </p>
+            <p>
+                Categories with less than two years of data use the trend line alone. The yearly total adds up the forecasts for each of the next 12 months{f', with a ridge penalty of {ridge:g}' if ridge else ''}.
+            </p>
+        """, unsafe_allow_html=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    # Backtest: the MSE Loss above is in-sample, so score forecasts made from every past cutoff
+    st.markdown('<div class="card"><h3>🧪 Backtest: Out-of-Sample Accuracy</h3>', unsafe_allow_html=True)
+    if st.checkbox("Run a rolling-origin backtest (next-month forecasts from every past month)", key='run_backtest'):
+        with profiler.stage('backtest') as stage:
+            per_category, overall = backtest_categories(session_category_monthly())
+            stage.rows = overall['Forecasts']
+        if per_category.empty:
+            st.info("Not enough history to backtest: a category needs 3 months of data.")
+        else:
+            st.markdown(f"<p>Over <strong>{overall['Forecasts']}</strong> next-month forecasts: "
+                        f"MAE <strong>${overall['MAE']:.2f}</strong>, MSE <strong>{overall['MSE']:.2f}</strong>, "
+                        f"MAPE <strong>{overall['MAPE (%)']:.1f}%</strong></p>", unsafe_allow_html=True)
+            st.dataframe(per_category.round(2), use_container_width=True, hide_index=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
 
@@ -520,6 +896,10 @@ def main():
     # Initialize session state for navigation and data persistence
     if 'page' not in st.session_state: st.session_state['page']='home'
     if 'df' not in st.session_state: st.session_state['df'] = pd.DataFrame()
+    if 'agg' not in st.session_state: st.session_state['agg'] = pd.DataFrame()
+    if 'cube' not in st.session_state and STORE_PATH and get_store().has_transactions():
+        # Statements saved by earlier sessions are available right away
+        set_store_view(get_store())
     
     # Use st.sidebar for navigation to keep the main content clean
     with st.sidebar:
@@ -530,15 +910,25 @@ def main():
         if st.button("🔎 Analyze", use_container_width=True): st.session_state['page']='analyze'
         if st.button("🔮 Predict", use_container_width=True): st.session_state['page']='predict'
         st.markdown("---")
+        if precompute_pending():
+            render_precompute_progress()
 
 
+    profiler = get_profiler()
+    profiler.enabled = st.sidebar.checkbox("Profile page stages", value=PROFILE_ENABLED_DEFAULT, key='profiling')
+
     # Page routing
     page = st.session_state['page']
-    
+    profiler.start_run(page)
+
     if page == 'home': home_page()
     elif page == 'manage': manage_page()
     elif page == 'analyze': analyze_page()
     elif page == 'predict': predict_page()
 
+    profiler.end_run()
+    if profiler.enabled:
+        render_perf_panel(profiler)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,95 @@
+"""The vectorized paths against the straightforward versions they replace."""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import aggregate_statement, statement_cents
+from forecasting import fit_linear_grouped
+from ingest import merge_statements, read_statement, stream_statement
+from store import TransactionStore
+from waste import DEFAULT_WASTE_KEYWORDS, WasteMatcher, label_waste
+
+
+def make_statement(n, seed=0):
+    """Synthetic statement CSV rows over about three years, with repeated descriptions."""
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2021-01-01') + pd.to_timedelta(rng.integers(0, 1000, n), unit='D')
+    return pd.DataFrame({
+        'Date': dates.strftime('%Y-%m-%d'),
+        'Category': rng.choice(['Groceries', 'Rent', 'Dining Out', 'Pub', 'Travel', 'Income', 'Savings'], n),
+        'Description': rng.choice(['Swiggy order', 'UBER  ride', 'grocery', 'rent', 'Coffee shop', None], n),
+        'Amount': [f'${value:,.2f}' for value in rng.normal(50, 80, n)],
+    })
+
+def csv_source(rows):
+    return io.BytesIO(rows.to_csv(index=False).encode())
+
+
+def test_grouped_fit_matches_polyfit():
+    rng = np.random.default_rng(1)
+    n_groups = 25
+    codes = rng.integers(0, n_groups, 2000)
+    # Month sequence numbers (year * 12 + month) are large, as on the Predict page
+    x = (24250 + rng.integers(0, 48, 2000)).astype(np.float64)
+    y = 3.5 * (x - 24250) + rng.normal(0, 40, 2000)
+
+    slopes, intercepts, counts = fit_linear_grouped(codes, x, y, n_groups)
+
+    for group in range(n_groups):
+        in_group = codes == group
+        m, b = np.polyfit(x[in_group], y[in_group], 1)
+        assert counts[group] == in_group.sum()
+        assert slopes[group] == pytest.approx(m, rel=1e-6)
+        np.testing.assert_allclose(slopes[group] * x[in_group] + intercepts[group],
+                                   np.polyval([m, b], x[in_group]), rtol=1e-6, atol=1e-6)
+
+def test_grouped_fit_without_spread_falls_back_to_mean():
+    slopes, intercepts, _ = fit_linear_grouped([0, 0, 1], [5.0, 5.0, 7.0], [1.0, 3.0, 4.0], 2)
+    np.testing.assert_array_equal(slopes, [0.0, 0.0])
+    np.testing.assert_array_equal(intercepts, [2.0, 4.0])
+
+
+def test_streamed_aggregate_matches_full_frame():
+    rows = make_statement(5000, seed=2)
+    matcher = WasteMatcher(DEFAULT_WASTE_KEYWORDS)
+
+    full = aggregate_statement(label_waste(read_statement(csv_source(rows)), matcher))
+    streamed = stream_statement(csv_source(rows), matcher, chunksize=701)
+
+    pd.testing.assert_frame_equal(streamed, full, check_dtype=False)
+
+
+def test_waste_matcher_matches_row_wise_rule():
+    df = read_statement(csv_source(make_statement(3000, seed=3)))
+    keywords = DEFAULT_WASTE_KEYWORDS
+
+    # The per-row rule the Manage page used to apply
+    expected = df.apply(
+        lambda row: row['Category'] in keywords
+        or any(keyword.lower() in str(row.get('Description', '')).lower() for keyword in keywords),
+        axis=1,
+    )
+
+    pd.testing.assert_series_equal(WasteMatcher(keywords).classify(df), expected, check_names=False)
+
+
+def test_store_skips_transactions_repeated_across_uploads(tmp_path):
+    first = make_statement(2000, seed=4)
+    # Same charge twice in one file: both are real and must be kept
+    first = pd.concat([first, first.iloc[[0]]], ignore_index=True)
+    overlap = first.iloc[1500:]
+    second = pd.concat([overlap, make_statement(1500, seed=5)], ignore_index=True)
+    frames = [read_statement(csv_source(rows)) for rows in (first, second)]
+
+    store = TransactionStore(str(tmp_path / 'store.db'))
+    inserted = [store.insert_statement(df, digest) for df, digest in zip(frames, ['first', 'second'])]
+    # Uploading the same file again is a no-op
+    assert store.insert_statement(frames[1], 'second') == 0
+
+    merged, dropped = merge_statements(frames)
+    assert inserted == [len(frames[0]), len(frames[1]) - dropped[1]]
+    (rows, cents), = store.query("SELECT COUNT(*), SUM(cents) FROM transactions")
+    assert rows == len(merged) == len(frames[0]) + len(frames[1]) - len(overlap)
+    assert cents == statement_cents(merged).sum()
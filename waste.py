@@ -0,0 +1,50 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from aggregates import statement_descriptions
+from caching import content_digest
+
+# Merged waste list from manager.js and streamlit.py
+DEFAULT_WASTE_KEYWORDS = [
+    'Luxury Items', 'Jewelry', 'Vacation', 'Pub', 'Liquor Store', 
+    'Dining Out', 'Entertainment', 'swiggy', 'uber', 'zomato', 
+    'bar', 'delivery', 'coffee', 'cab'
+]
+
+# --- Waste Keyword Index ---
+class WasteMatcher:
+    """Precompiled waste keyword index.
+
+    A row is waste when its Category is one of the keywords or its
+    Description contains one (case-insensitive), as in manager.js. All
+    keywords are folded into a single alternation regex, and each distinct
+    Description is scanned once no matter how many rows share it.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = tuple(dict.fromkeys(k for k in keywords if k))
+        # Labels stored on a statement remember which keyword list produced them
+        self.signature = content_digest('\n'.join(self.keywords).encode('utf-8'))
+        # Longest first so overlapping keywords do not shadow each other
+        lowered = sorted({k.lower() for k in self.keywords}, key=len, reverse=True)
+        self._pattern = re.compile('|'.join(map(re.escape, lowered))) if lowered else None
+
+    def classify(self, df):
+        """Boolean Series marking the waste rows of df, computed column-wise."""
+        if self._pattern is None or df.empty:
+            return pd.Series(False, index=df.index)
+
+        codes, uniques = pd.factorize(statement_descriptions(df), use_na_sentinel=False)
+        unique_hits = pd.Index(uniques).astype(str).str.lower().str.contains(self._pattern, regex=True)
+        description_hits = np.asarray(unique_hits, dtype=bool)[codes]
+
+        return df['Category'].isin(self.keywords) | description_hits
+
+
+def label_waste(df, matcher):
+    """Stores the waste label on the statement so later views never rescan text."""
+    df['Waste'] = matcher.classify(df)
+    df.attrs['waste_signature'] = matcher.signature
+    return df